@@ -0,0 +1,195 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Headless benchmark of node shape loading and painting.
+
+Usage:
+    hython benchmarks/node_shapes.py [--sizes 10 100 1000 10000] [--shapes 20] [--repeat 5] [--json out.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+try:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+except ImportError:
+    from PySide2.QtWidgets import *
+    from PySide2.QtGui import *
+    from PySide2.QtCore import *
+
+# Widgets and icons are created on import, so the application must exist first
+app = QApplication.instance() or QApplication([sys.argv[0], '-platform', 'offscreen'])
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python2.7libs'))
+
+from houdini_tdk.node_shape import NodeShape, NodeShapeRegistry
+from houdini_tdk.node_shape_delegate import NodeShapeDelegate
+from houdini_tdk.node_shape_list_model import NodeShapeListModel
+from houdini_tdk.node_shape_list_view import NodeShapeListView
+
+CELL_SIZE = QSize(100, 88)
+COLUMN_COUNT = 7
+
+
+def writeShapeFiles(folder, point_count, shape_count):
+    file_paths = []
+    for index in range(shape_count):
+        # Wavy ellipse, different for every shape
+        outline = []
+        for point in range(point_count):
+            angle = 2 * math.pi * point / point_count
+            radius = 1 + 0.1 * math.sin(angle * (index % 7 + 3))
+            outline.append([round(2 * radius * math.cos(angle), 6), round(radius * math.sin(angle), 6)])
+
+        name = 'bench_{0}_{1}'.format(point_count, index)
+        file_path = os.path.join(folder, name + '.json')
+        with open(file_path, 'w') as file:
+            json.dump({'name': name, 'outline': outline}, file)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def measure(func, repeat):
+    """Best time of several runs, in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def paintFrame(delegate, model, image):
+    painter = QPainter(image)
+    option = QStyleOptionViewItem()
+    for row in range(model.rowCount()):
+        column = row % COLUMN_COUNT
+        line = row // COLUMN_COUNT
+        option.rect = QRect(QPoint(column * CELL_SIZE.width(), line * CELL_SIZE.height()), CELL_SIZE)
+        delegate.paint(painter, option, model.index(row, 0))
+    painter.end()
+
+
+def benchmarkSize(folder, point_count, shape_count, repeat):
+    file_paths = writeShapeFiles(folder, point_count, shape_count)
+    for file_path in file_paths:
+        NodeShapeRegistry.register(file_path)
+    names = [os.path.splitext(os.path.basename(file_path))[0] for file_path in file_paths]
+
+    def loadCold():
+        NodeShape.clearCache()
+        for file_path in file_paths:
+            NodeShape.fromFile(file_path)
+
+    def loadWarm():
+        for file_path in file_paths:
+            NodeShape.fromFile(file_path)
+
+    def loadByName():
+        for name in names:
+            NodeShape.fromName(name)
+
+    loadCold()
+    shapes = [NodeShape.fromFile(file_path) for file_path in file_paths]
+    rect = QRectF(0, 0, 90, 60)
+
+    def fitInRect():
+        for shape in shapes:
+            shape.fittedInRect(rect)
+
+    fitted_shapes = [shape.fittedInRect(rect) for shape in shapes]
+
+    def painterPath():
+        for shape in fitted_shapes:
+            shape.painterPath()
+
+    # Delegate
+    model = QStandardItemModel()
+    for shape in shapes:
+        item = QStandardItem(shape.name())
+        item.setData(shape, NodeShapeListModel.ShapeRole)
+        model.appendRow(item)
+
+    view = NodeShapeListView()
+    view.setGridSize(CELL_SIZE)
+    delegate = NodeShapeDelegate(view)
+
+    line_count = (shape_count + COLUMN_COUNT - 1) // COLUMN_COUNT
+    image = QImage(CELL_SIZE.width() * COLUMN_COUNT, CELL_SIZE.height() * line_count, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+
+    def paintCold():
+        delegate.clearCache()
+        paintFrame(delegate, model, image)
+
+    def paintWarm():
+        paintFrame(delegate, model, image)
+
+    results = []
+    for name, func, per_frame in (('fromFile (cold)', loadCold, False),
+                                  ('fromFile (cached)', loadWarm, False),
+                                  ('fromName', loadByName, False),
+                                  ('fitInRect', fitInRect, False),
+                                  ('painterPath', painterPath, False),
+                                  ('delegate paint (cold)', paintCold, True),
+                                  ('delegate paint (cached)', paintWarm, True)):
+        seconds = measure(func, repeat)
+        results.append({
+            'points': point_count,
+            'benchmark': name,
+            'per_shape_ms': seconds * 1000.0 / shape_count,
+            'per_frame_ms': seconds * 1000.0 if per_frame else None
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Node shape loading and painting benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='Outline point counts')
+    parser.add_argument('--shapes', type=int, default=20, help='Shapes per point count')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark, the best one is reported')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args(argv)
+
+    folder = tempfile.mkdtemp(prefix='tdk_node_shapes_')
+    try:
+        results = []
+        for point_count in args.sizes:
+            results.extend(benchmarkSize(folder, point_count, args.shapes, args.repeat))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print('{0:>8}  {1:<24}{2:>14}{3:>14}'.format('Points', 'Benchmark', 'ms / shape', 'ms / frame'))
+    for result in results:
+        per_frame = result['per_frame_ms']
+        print('{0:>8}  {1:<24}{2:>14.4f}{3:>14}'.format(result['points'], result['benchmark'],
+                                                        result['per_shape_ms'],
+                                                        '{0:.3f}'.format(per_frame) if per_frame is not None else '-'))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+from collections import OrderedDict
+
+import hou
+
+ICON_EXTENSIONS = ('.svg', '.png')
+INDEX_FILE = '$HOUDINI_USER_PREF_DIR/tdk_icon_index.json'
+INDEX_VERSION = 1
+
+
+def iconDirectories():
+    hfs_path = os.path.normpath(hou.expandString('$HFS/houdini'))
+    for path in hou.houdiniPath():
+        path = os.path.normpath(path)
+        if path == hfs_path:  # Already listed in SVGIcons.index
+            continue
+        yield os.path.join(path, 'config', 'Icons')
+
+
+class IconDirectoryIndex(object):
+    """
+    Icons found in config/Icons folders on the Houdini path.
+    Each folder is listed again only when its modification time changes,
+    listings are kept in the user preferences folder between sessions.
+    """
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if IconDirectoryIndex._instance is None:
+            IconDirectoryIndex._instance = IconDirectoryIndex()
+        return IconDirectoryIndex._instance
+
+    def __init__(self, index_file=INDEX_FILE):
+        self._index_file = hou.expandString(index_file)
+        self._listings = {}
+        self._modified = False
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self._index_file) as file:
+                data = json.load(file)
+        except (IOError, ValueError):
+            return
+
+        if data.get('version') == INDEX_VERSION:
+            self._listings = data.get('directories', {})
+
+    def save(self):
+        if not self._modified:
+            return
+
+        data = {
+            'version': INDEX_VERSION,
+            'directories': self._listings
+        }
+        try:
+            with open(self._index_file, 'w') as file:
+                json.dump(data, file)
+            self._modified = False
+        except IOError:
+            pass
+
+    def _listDirectory(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            if self._listings.pop(path, None) is not None:
+                self._modified = True
+            return (), ()
+
+        listing = self._listings.get(path)
+        if listing is not None and listing['mtime'] == mtime:
+            return listing['files'], listing['dirs']
+
+        files = []
+        dirs = []
+        try:
+            for name in sorted(os.listdir(path)):
+                if os.path.isdir(os.path.join(path, name)):
+                    dirs.append(name)
+                elif os.path.splitext(name)[-1].lower() in ICON_EXTENSIONS:
+                    files.append(name)
+        except OSError:
+            pass
+
+        self._listings[path] = {
+            'mtime': mtime,
+            'files': files,
+            'dirs': dirs
+        }
+        self._modified = True
+        return files, dirs
+
+    def icons(self):
+        icons = OrderedDict()
+
+        for root in iconDirectories():
+            files, dirs = self._listDirectory(root)
+            for file_name in files:
+                icons.setdefault(file_name, os.path.join(root, file_name))
+
+            # Icons/SOP/box.svg -> SOP_box.svg
+            for context in dirs:
+                context_path = os.path.join(root, context)
+                context_files, _ = self._listDirectory(context_path)
+                for file_name in context_files:
+                    icons.setdefault(context + '_' + file_name, os.path.join(context_path, file_name))
+
+        self.save()
+        return icons
@@ -16,6 +16,9 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
+from collections import deque
+
 try:
     from PyQt5.QtWidgets import *
     from PyQt5.QtGui import *
@@ -32,6 +35,19 @@ import hou
 from .filter_field import FilterField
 from .slider import Slider
 from .fuzzy_filter_proxy_model import FuzzyFilterProxyModel
+from .lru_cache import LRUCache, pixmapCost
+from .icon_index import IconDirectoryIndex
+
+try:
+    ICON_CACHE_LIMIT = int(hou.getenv('TDK_ICON_CACHE_LIMIT', '64')) * 1024 * 1024
+except ValueError:
+    ICON_CACHE_LIMIT = 64 * 1024 * 1024
+
+# Rows are exposed to views in chunks of this size
+FETCH_CHUNK_SIZE = 256
+
+# Icons are rasterized only at these sizes, smaller sizes are scaled down from the nearest larger level
+MIPMAP_LEVELS = (64, 96, 128)
 
 
 def standardIconExists(name):
@@ -42,25 +58,123 @@ def standardIconExists(name):
         return False
 
 
+def mipmapLevel(size):
+    for level in MIPMAP_LEVELS:
+        if level >= size:
+            return level
+    return size
+
+
+def formatByteSize(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return '{0:.1f} {1}'.format(size, unit)
+        size /= 1024.0
+    return '{0:.1f} GB'.format(size)
+
+
 class IconListModel(QAbstractListModel):
     def __init__(self, parent=None):
         super(IconListModel, self).__init__(parent)
 
         self._icon_size = 64
+        self._pixmap_cache = LRUCache(ICON_CACHE_LIMIT, pixmapCost)
 
         # Data
+        self.__data = ()
+        self.__icon_files = {}
+        self.__loaded_count = 0
+        self.updateIconList()
+
+    def updateIconList(self):
+        self.beginResetModel()
+
         ICON_INDEX_FILE = hou.expandString('$HFS/houdini/config/Icons/SVGIcons.index')
-        self.__data = tuple(sorted(hou.loadIndexDataFromFile(ICON_INDEX_FILE).keys()))
+        names = set(hou.loadIndexDataFromFile(ICON_INDEX_FILE).keys())
+
+        self.__icon_files = IconDirectoryIndex.instance().icons()
+        names.update(self.__icon_files.keys())
+
+        self.__data = tuple(sorted(names))
+        self.__loaded_count = min(FETCH_CHUNK_SIZE, len(self.__data))
+        self._pixmap_cache.clear()
+
+        self.endResetModel()
 
     def iconSize(self):
         return self._icon_size
 
     def setIconSize(self, size):
         self._icon_size = size
-        self.dataChanged.emit(self.index(0, 0), self.index(len(self.__data), 0), [Qt.DecorationRole])
 
-    def rowCount(self, parent):
-        return len(self.__data)
+        # Keep mipmap levels, drop pixmaps scaled for the previous size
+        for key in self._pixmap_cache.keys():
+            _, cached_size = key
+            if cached_size != size and cached_size not in MIPMAP_LEVELS:
+                self._pixmap_cache.pop(key)
+
+        if self.__loaded_count:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.__loaded_count - 1, 0), [Qt.DecorationRole])
+
+    def cacheLimit(self):
+        return self._pixmap_cache.maxCost()
+
+    def setCacheLimit(self, size):
+        self._pixmap_cache.setMaxCost(size)
+
+    def cacheSize(self):
+        return self._pixmap_cache.totalCost()
+
+    def cacheHitRate(self):
+        return self._pixmap_cache.hitRate()
+
+    def clearCache(self):
+        self._pixmap_cache.clear()
+        self._pixmap_cache.resetStats()
+
+    def iconPixmap(self, icon_name, size):
+        key = (icon_name, size)
+        pixmap = self._pixmap_cache.get(key)
+        if pixmap is None:
+            level = mipmapLevel(size)
+            if level == size:
+                source = self.__icon_files.get(icon_name, icon_name)
+                pixmap = hou.qt.Icon(source, size, size).pixmap(size, size)
+            else:
+                pixmap = self.iconPixmap(icon_name, level).scaled(size, size, Qt.KeepAspectRatio,
+                                                                  Qt.SmoothTransformation)
+            self._pixmap_cache.put(key, pixmap)
+        return pixmap
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+
+        return self.__loaded_count
+
+    def canFetchMore(self, parent):
+        if parent.isValid():
+            return False
+
+        return self.__loaded_count < len(self.__data)
+
+    def _fetchUntil(self, count):
+        count = min(count, len(self.__data))
+        if count <= self.__loaded_count:
+            return
+
+        self.beginInsertRows(QModelIndex(), self.__loaded_count, count - 1)
+        self.__loaded_count = count
+        self.endInsertRows()
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+
+        self._fetchUntil(self.__loaded_count + FETCH_CHUNK_SIZE)
+
+    def fetchAll(self):
+        self._fetchUntil(len(self.__data))
 
     def data(self, index, role):
         if not index.isValid():
@@ -69,19 +183,20 @@ class IconListModel(QAbstractListModel):
         icon_name = self.__data[index.row()]
 
         if role == Qt.DisplayRole:
-            label = icon_name.replace('.svg', '')  # VOP_wood.svg -> VOP_wood
+            label, _ = os.path.splitext(icon_name)  # VOP_wood.svg -> VOP_wood
             if '_' in label:
                 label = ' '.join(label.split('_')[1:]).title()  # VOP_wood -> Wood
             return label
         elif role == Qt.DecorationRole:
-            return hou.qt.Icon(icon_name, self._icon_size, self._icon_size)
+            return self.iconPixmap(icon_name, self._icon_size)
         elif role == Qt.UserRole or role == Qt.ToolTipRole:
             return icon_name
 
     def indexByKey(self, key):
-        for index, name in enumerate(self.__data):
-            if name[:-4] == key:
-                return self.index(index, 0)
+        for row, name in enumerate(self.__data):
+            if os.path.splitext(name)[0] == key:
+                self._fetchUntil(row + 1)
+                return self.index(row, 0)
 
         return QModelIndex()
 
@@ -107,6 +222,19 @@ class IconListView(QListView):
 
         self.setSpacing(15)
 
+        # Prefetch
+        self._prefetch_rows = 2
+        self._prefetch_chunk_size = 4
+        self._prefetch_queue = deque()
+        self._scroll_direction = 1
+        self._last_scroll_value = 0
+
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setInterval(0)
+        self._prefetch_timer.timeout.connect(self._prefetchChunk)
+
+        self.verticalScrollBar().valueChanged.connect(self._onScrolled)
+
         # Item Double Clicked
         self._item_double_clicked_signal_enabled = False
         self.doubleClicked.connect(self.__emitItemDoubleClicked)
@@ -129,12 +257,111 @@ class IconListView(QListView):
     def enableDoubleClickedSignal(self, enable=True):
         self._item_double_clicked_signal_enabled = enable
 
+    def prefetchRows(self):
+        return self._prefetch_rows
+
+    def setPrefetchRows(self, rows):
+        self._prefetch_rows = max(rows, 0)
+        self.schedulePrefetch()
+
+    def _visibleRowRange(self):
+        model = self.model()
+        row_count = model.rowCount() if model else 0
+        if not row_count:
+            return None
+
+        viewport_height = self.viewport().height()
+
+        def isAbove(row):
+            rect = self.visualRect(model.index(row, 0))
+            return rect.isValid() and rect.bottom() < 0
+
+        def isBelow(row):
+            rect = self.visualRect(model.index(row, 0))
+            return not rect.isValid() or rect.top() > viewport_height
+
+        # Items are laid out row by row, so visual position grows with the row number
+        low, high = 0, row_count
+        while low < high:
+            middle = (low + high) // 2
+            if isAbove(middle):
+                low = middle + 1
+            else:
+                high = middle
+        first = low
+
+        low, high = first, row_count
+        while low < high:
+            middle = (low + high) // 2
+            if isBelow(middle):
+                high = middle
+            else:
+                low = middle + 1
+        last = low - 1
+
+        if first > last:
+            return None
+        return first, last
+
+    def _columnCount(self, first, last):
+        model = self.model()
+        top = self.visualRect(model.index(first, 0)).top()
+        columns = 1
+        for row in range(first + 1, last + 1):
+            if self.visualRect(model.index(row, 0)).top() != top:
+                break
+            columns += 1
+        return columns
+
+    def schedulePrefetch(self):
+        self._prefetch_queue.clear()
+
+        visible_range = self._visibleRowRange()
+        if not self._prefetch_rows or visible_range is None:
+            self._prefetch_timer.stop()
+            return
+
+        first, last = visible_range
+        amount = self._prefetch_rows * self._columnCount(first, last)
+        row_count = self.model().rowCount()
+
+        ahead = range(last + 1, min(last + 1 + amount, row_count))
+        behind = range(first - 1, max(first - 1 - amount, -1), -1)
+        if self._scroll_direction < 0:
+            ahead, behind = behind, ahead
+
+        self._prefetch_queue.extend(ahead)
+        self._prefetch_queue.extend(behind)
+        self._prefetch_timer.start()
+
+    def _prefetchChunk(self):
+        model = self.model()
+        row_count = model.rowCount() if model else 0
+        for _ in range(self._prefetch_chunk_size):
+            if not self._prefetch_queue:
+                self._prefetch_timer.stop()
+                return
+
+            row = self._prefetch_queue.popleft()
+            if row < row_count:
+                model.index(row, 0).data(Qt.DecorationRole)
+
+    def _onScrolled(self, value):
+        if value != self._last_scroll_value:
+            self._scroll_direction = 1 if value > self._last_scroll_value else -1
+            self._last_scroll_value = value
+        self.schedulePrefetch()
+
+    def resizeEvent(self, event):
+        super(IconListView, self).resizeEvent(event)
+        self.schedulePrefetch()
+
     def copySelectedIconName(self):
         names = []
         for index in self.selectedIndexes():
             names.append(index.data(Qt.ToolTipRole))
 
-        QApplication.clipboard().setText('\n'.join(name[:-4] for name in names))
+        QApplication.clipboard().setText('\n'.join(os.path.splitext(name)[0] for name in names))
 
     def copySelectedIconFileName(self):
         names = []
@@ -143,12 +370,18 @@ class IconListView(QListView):
 
         QApplication.clipboard().setText('\n'.join(names))
 
+    def _iconListModel(self):
+        model = self.model()
+        while isinstance(model, QAbstractProxyModel):
+            model = model.sourceModel()
+        return model
+
     def _selectedImage(self):
         indexes = self.selectedIndexes()
         if len(indexes) == 1:
-            name = indexes[0].data(Qt.UserRole)
-            icon_size = self.model().iconSize()
-            return hou.qt.Icon(name, icon_size, icon_size).pixmap(icon_size, icon_size)
+            # Icons from custom directories are only known to the model
+            model = self._iconListModel()
+            return model.iconPixmap(indexes[0].data(Qt.UserRole), model.iconSize())
 
     def copySelectedIcon(self):
         image = self._selectedImage()
@@ -265,7 +498,7 @@ class IconListDialog(QDialog):
 
         # Filter
         self.filter_field = FilterField()
-        self.filter_field.textChanged.connect(self.filter_proxy_model.setFilterPattern)
+        self.filter_field.textChanged.connect(self._onFilterChanged)
         top_layout.addWidget(self.filter_field)
 
         # Scale
@@ -275,6 +508,7 @@ class IconListDialog(QDialog):
         self.slider.setRange(48, 128)
         self.slider.valueChanged.connect(self.setIconSize)
         self.slider.setValue(64)
+        self.slider.installEventFilter(self)
         top_layout.addWidget(self.slider)
 
         # Buttons
@@ -303,6 +537,7 @@ class IconListDialog(QDialog):
             self.slider.blockSignals(False)
             self.icon_list_model.setIconSize(size)
             self.icon_list_view.setIconSize(QSize(size, size))
+            self.icon_list_view.schedulePrefetch()
 
     def zoomIn(self, amount=4):
         self.setIconSize(self.icon_list_model.iconSize() + amount)
@@ -310,6 +545,18 @@ class IconListDialog(QDialog):
     def zoomOut(self, amount=4):
         self.setIconSize(self.icon_list_model.iconSize() - amount)
 
+    def _onFilterChanged(self, pattern):
+        if pattern:
+            # Matches are ranked across the whole catalog
+            self.icon_list_model.fetchAll()
+        self.filter_proxy_model.setFilterPattern(pattern)
+
+    def cacheUsageText(self):
+        model = self.icon_list_model
+        return 'Cache: {0} / {1}\nHit rate: {2:.0%}'.format(formatByteSize(model.cacheSize()),
+                                                            formatByteSize(model.cacheLimit()),
+                                                            model.cacheHitRate())
+
     def eventFilter(self, watched, event):
         if watched == self.icon_list_view.viewport() and event.type() == QEvent.Wheel:
             if event.modifiers() == Qt.ControlModifier:
@@ -318,12 +565,18 @@ class IconListDialog(QDialog):
                 else:
                     self.zoomOut()
                 return True
+        elif watched == self.slider and event.type() == QEvent.ToolTip:
+            text = 'Size: {0}\n{1}'.format(self.slider.value(), self.cacheUsageText())
+            QToolTip.showText(event.globalPos(), text, self.slider)
+            return True
         return False
 
     def keyPressEvent(self, event):
         if event.matches(QKeySequence.Find) or event.key() == Qt.Key_F3:
             self.filter_field.setFocus()
             self.filter_field.selectAll()
+        elif event.matches(QKeySequence.Refresh):
+            self.icon_list_model.updateIconList()
         elif event.matches(QKeySequence.ZoomIn):
             self.zoomIn()
         elif event.matches(QKeySequence.ZoomOut):
@@ -344,15 +597,14 @@ class IconListDialog(QDialog):
         window.enableDialogMode()
 
         if name:
-            model = window.icon_list_view.model()
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                if index.data(Qt.UserRole) == name + '.svg':
-                    window.icon_list_view.setCurrentIndex(index)
-                    break
+            index = window.icon_list_model.indexByKey(name)
+            index = window.filter_proxy_model.mapFromSource(index)
+            if index.isValid():
+                window.icon_list_view.setCurrentIndex(index)
 
         if window.exec_() and window.icon_list_view.currentIndex().isValid():
-            return window.icon_list_view.currentIndex().data(Qt.UserRole).replace('.svg', '')
+            icon_name, _ = os.path.splitext(window.icon_list_view.currentIndex().data(Qt.UserRole))
+            return icon_name
 
 
 def findIcon(**kwargs):
@@ -0,0 +1,117 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+
+
+def pixmapCost(pixmap):
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class LRUCache(object):
+    """
+    Least recently used cache with a total cost limit, similar to QCache.
+    Cost of each value is given by cost_func, every value costs 1 by default.
+    """
+
+    def __init__(self, max_cost=100, cost_func=None):
+        self._items = OrderedDict()
+        self._costs = {}
+        self._max_cost = max_cost
+        self._total_cost = 0
+        self._cost_func = cost_func or (lambda value: 1)
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+
+    def maxCost(self):
+        return self._max_cost
+
+    def setMaxCost(self, max_cost):
+        self._max_cost = max_cost
+        self._trim()
+
+    def totalCost(self):
+        return self._total_cost
+
+    def hits(self):
+        return self._hits
+
+    def misses(self):
+        return self._misses
+
+    def hitRate(self):
+        requests = self._hits + self._misses
+        if not requests:
+            return 0.0
+        return self._hits / float(requests)
+
+    def resetStats(self):
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def keys(self):
+        return tuple(self._items.keys())
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self._misses += 1
+            return default
+
+        # Move to the most recently used end
+        self._items[key] = value
+        self._hits += 1
+        return value
+
+    def put(self, key, value):
+        self.pop(key)
+
+        cost = self._cost_func(value)
+        if cost > self._max_cost:
+            return
+
+        self._items[key] = value
+        self._costs[key] = cost
+        self._total_cost += cost
+        self._trim()
+
+    def pop(self, key, default=None):
+        if key not in self._items:
+            return default
+
+        self._total_cost -= self._costs.pop(key)
+        return self._items.pop(key)
+
+    def clear(self):
+        self._items.clear()
+        self._costs.clear()
+        self._total_cost = 0
+
+    def _trim(self):
+        while self._total_cost > self._max_cost and self._items:
+            key = next(iter(self._items))
+            self.pop(key)
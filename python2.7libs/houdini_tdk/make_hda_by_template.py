@@ -41,6 +41,8 @@ from .notification import notify
 from .node_shape import NodeShape
 from .input_field import InputField
 
+SHAPE_PREVIEW_DELAY = 200  # ms
+
 
 def qColorFromHoudiniColor(color):
     return QColor.fromRgbF(*color.rgb())
@@ -357,10 +359,16 @@ class NodeShapeField(QWidget):
         self.shape_preview.setToolTip('Shape preview')
         self.shape_preview.setFixedSize(52, 24)
         layout.addWidget(self.shape_preview)
-        self.edit.textChanged.connect(self.shape_preview.setShape)
         if self.node_shape:
             self.shape_preview.setShape(self.node_shape)
 
+        # Resolve the name only after typing pauses
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(SHAPE_PREVIEW_DELAY)
+        self._preview_timer.timeout.connect(self._updatePreview)
+        self.edit.textChanged.connect(self._preview_timer.start)
+
         self.pick_shape_button = QPushButton()
         self.pick_shape_button.setToolTip('Pick shape')
         self.pick_shape_button.setFixedSize(24, 24)
@@ -390,10 +398,20 @@ class NodeShapeField(QWidget):
         if NodeShape.isValidShape(name):
             return name
 
+    def _updatePreview(self):
+        self._preview_timer.stop()
+
+        name = self.edit.text()
+        if not name:
+            self.shape_preview.setShape(None)
+        elif NodeShape.isValidShape(name):  # In-memory lookup, no file access for partial names
+            self.shape_preview.setShape(name)
+
     def _pickShape(self):
         shape_name = NodeShapeListDialog.getShapeName(self, 'Pick Node Shape', self.edit.text())
         if shape_name:
             self.edit.setText(shape_name)
+            self._updatePreview()
 
 
 class MakeHDAByTemplateDialog(QDialog):
@@ -17,6 +17,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import os
+import stat
+from collections import deque
+from multiprocessing.pool import ThreadPool
 
 try:
     from PyQt5.QtWidgets import *
@@ -31,6 +34,33 @@ except ImportError:
 
 import hou
 
+FILE_PROBE_THREADS = 16
+STATS_CHUNK_SIZE = 500
+
+# Editor languages of code parms, mapped to the code stats sections
+CODE_LANGUAGES = {
+    'python': 'python',
+    'hscript': 'hscript',
+    'vex': 'vex',
+    'opencl': 'opencl',
+    'cl': 'opencl'
+}
+
+# Line comment prefix, block comment start and end
+COMMENT_SYNTAX = {
+    'python': ('#', None, None),
+    'hscript': ('#', None, None),
+    'vex': ('//', '/*', '*/'),
+    'opencl': ('//', '/*', '*/')
+}
+
+# Parm classes
+PARM_NODE_REFERENCE = 'node'
+PARM_NODE_REFERENCE_LIST = 'node_list'
+PARM_FILE_REFERENCE = 'file'
+PARM_CODE = 'code'
+PARM_STRING = 'string'
+
 
 def parmHasExpression(parm):
     try:
@@ -41,15 +71,114 @@ def parmHasExpression(parm):
 
 
 def parmHasCode(parm):
-    pass
+    return parmClass(parm)[0] == PARM_CODE
+
+
+def countCodeLines(code, lang):
+    """Returns line, empty line and comment line counts of the code in a single pass."""
+    line_comment, block_start, block_end = COMMENT_SYNTAX[lang]
+
+    lines = empty = comments = 0
+    in_block = False
+    for line in code.splitlines():
+        lines += 1
+        if not line.strip():
+            empty += 1
+            continue
+
+        # A comment line has nothing but comments on it
+        has_code = False
+        position = 0
+        while position < len(line):
+            if in_block:
+                end = line.find(block_end, position)
+                if end < 0:
+                    break
+                in_block = False
+                position = end + len(block_end)
+                continue
+
+            line_comment_start = line.find(line_comment, position)
+            block_comment_start = line.find(block_start, position) if block_start is not None else -1
+            if block_comment_start >= 0 and (line_comment_start < 0 or block_comment_start < line_comment_start):
+                has_code = has_code or bool(line[position:block_comment_start].strip())
+                in_block = True
+                position = block_comment_start + len(block_start)
+            else:
+                end = line_comment_start if line_comment_start >= 0 else len(line)
+                has_code = has_code or bool(line[position:end].strip())
+                break
+
+        if not has_code:
+            comments += 1
+    return lines, empty, comments
+
+
+def addCodeStats(data, code, lang):
+    lines, empty, comments = countCodeLines(code, lang)
+    addStats(data, {
+        ('code', lang, 'total'): 1,
+        ('code', lang, 'lines'): lines,
+        ('code', lang, 'empty'): empty,
+        ('code', lang, 'comments'): comments
+    })
+
+
+def parmClass(parm):
+    """
+    Returns a (class, code language) tuple for the parm template, or (None, None) for non-string parms.
+    The result is the same for every node of the same type, see ParmClassIndex.
+    """
+    parm_template = parm.parmTemplate()
+    if not isinstance(parm_template, hou.StringParmTemplate):
+        return None, None
+
+    string_type = parm_template.stringType()
+    if string_type == hou.stringParmType.NodeReference:
+        return PARM_NODE_REFERENCE, None
+    elif string_type == hou.stringParmType.NodeReferenceList:
+        return PARM_NODE_REFERENCE_LIST, None
+    elif string_type == hou.stringParmType.FileReference:
+        return PARM_FILE_REFERENCE, None
+
+    tags = parm_template.tags()
+    lang = CODE_LANGUAGES.get(tags.get('editorlang', '').lower())
+    if tags.get('editor') == '1' and lang is not None:
+        return PARM_CODE, lang
+
+    return PARM_STRING, None
+
+
+class ParmClassIndex(object):
+    """
+    Parm classes by node type and parm name.
+    Parm templates are inspected for the first node of each type only.
+    Spare parms differ between nodes of the same type and are not indexed.
+    """
+
+    def __init__(self):
+        self._types = {}
+
+    def parmClasses(self, node_type):
+        """Returns a dict of parm names to parmClass() results, filled by parmClass() as parms are met."""
+        key = node_type.nameWithCategory()
+        parm_classes = self._types.get(key)
+        if parm_classes is None:
+            parm_classes = self._types[key] = {}
+        return parm_classes
 
 
 class StatItem:
-    def __init__(self, text=None, value=None, child_items=()):
+    def __init__(self, text=None, value=None, child_items=(), key=None):
         self.text = text
         self.value = str(value) if value is not None else None
-        self._index = None
+        self.percentage = None
+        self.key = key  # Path to the value in the statistics data
+        self.index = 0
         self.parent = None
+        self.setChildItems(child_items)
+
+    def setChildItems(self, child_items):
         self._child_items = child_items or ()
         for index, item in enumerate(self._child_items):
             item.index = index
@@ -61,9 +190,23 @@ class StatItem:
     def __len__(self):
         return len(self._child_items)
 
+    def valueFromStats(self, data):
+        return str(data.get(self.key, 0))
 
-def gatherNetworkStats(root_node):
-    data = {
+
+class SubnetworkItem(StatItem):
+    """Network with its node count and share of all nodes. Child networks are added on expand."""
+
+    def __init__(self, session_id, text, value, percentage, has_subnetworks):
+        StatItem.__init__(self, text, value)
+        self.percentage = '{0:.1f}%'.format(percentage)
+        self.session_id = session_id
+        self.has_subnetworks = has_subnetworks
+        self.fetched = False
+
+
+def emptyStats():
+    return {
         'nodes': {
             'total': 0,
             'subnetworks': 0,
@@ -108,123 +251,636 @@ def gatherNetworkStats(root_node):
         }
     }
 
+
+def addStats(data, stats):
+    """
+    Adds counters from stats to data in place. Maximums are combined with max().
+    Both are sparse dicts of key paths into emptyStats(), such as ('nodes', 'total'), to values.
+    """
+    for key, value in stats.items():
+        if key[-1].startswith('max_'):
+            if value > data.get(key, 0):
+                data[key] = value
+        elif value:
+            data[key] = data.get(key, 0) + value
+
+
+def subtractStats(data, stats):
+    """Reverts addStats() for counters. Maximums cannot be reverted and are kept."""
+    for key, value in stats.items():
+        if not key[-1].startswith('max_') and value:
+            data[key] = data.get(key, 0) - value
+
+
+def nestedStats(stats):
+    """Converts sparse stats to the nested emptyStats() layout."""
+    data = emptyStats()
+    for key, value in stats.items():
+        values = data
+        for part in key[:-1]:
+            values = values[part]
+        values[key[-1]] = value
+    return data
+
+
+def probePath(path):
+    """Returns 'folders', 'files' or None if the path does not exist."""
+    try:
+        mode = os.stat(path).st_mode
+    except (OSError, ValueError):
+        return
+    return 'folders' if stat.S_ISDIR(mode) else 'files'
+
+
+def probePaths(paths, pool=None):
+    """
+    Checks each unique path once, in parallel. Returns a dict of paths to probePath() results.
+    A thread pool is created for the call unless an existing one is given.
+    """
+    paths = list(set(paths))
+    if len(paths) < 2:
+        return {path: probePath(path) for path in paths}
+
+    if pool is not None:
+        return dict(zip(paths, pool.map(probePath, paths)))
+
+    pool = ThreadPool(min(FILE_PROBE_THREADS, len(paths)))
+    try:
+        results = pool.map(probePath, paths)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(paths, results))
+
+
+def addFileStats(data, file_paths, probe_results):
+    for path in file_paths:
+        kind = probe_results.get(path)
+        if kind is not None:
+            data[('parms', 'links_to', kind)] = data.get(('parms', 'links_to', kind), 0) + 1
+
+
+def nodeStats(node, file_paths=None, parm_index=None, link_parms=None):
+    """
+    Contribution of a single node, without its children, as sparse stats (see addStats()).
+    File references are not checked here, their paths are appended to file_paths for probePaths().
+    Names of parms referring to other nodes or parms, resolved or not, are appended to link_parms.
+    """
+    parm_classes = parm_index.parmClasses(node.type()) if parm_index is not None else {}
+    spare_parms = set(parm.name() for parm in node.spareParms())
+
+    data = {
+        ('nodes', 'total'): 1,
+        ('nodes', 'max_depth'): node.path().count('/') - 1
+    }
+
+    if node.isNetwork():
+        data[('nodes', 'subnetworks')] = 1
+
+    if not node.isEditable():
+        data[('nodes', 'inside_locked')] = 1
+
+    links_to_parms = 0
+    links_to_nodes = 0
+    links_to_web = 0
+    animated = 0
+    for parm in node.parms():
+        name = parm.name()
+
+        if parm.getReferencedParm() != parm:
+            links_to_parms += 1
+            if link_parms is not None:
+                link_parms.append(name)
+
+        if name in spare_parms:
+            parm_class, code_lang = parmClass(parm)
+        else:
+            if name not in parm_classes:
+                parm_classes[name] = parmClass(parm)
+            parm_class, code_lang = parm_classes[name]
+
+        if parm_class is not None:
+            if parm_class == PARM_NODE_REFERENCE:
+                try:
+                    if parm.evalAsNode() is not None:
+                        links_to_nodes += 1
+                except hou.TypeError:
+                    pass
+                if link_parms is not None and parm.evalAsString():
+                    link_parms.append(name)
+            elif parm_class == PARM_NODE_REFERENCE_LIST:
+                links_to_nodes += len(parm.evalAsNodes())
+                if link_parms is not None and parm.evalAsString():
+                    link_parms.append(name)
+            elif parm_class == PARM_FILE_REFERENCE:
+                path = parm.evalAsString()
+                if path and file_paths is not None:
+                    file_paths.append(path)
+            elif parm_class == PARM_CODE:
+                try:
+                    code = parm.unexpandedString()
+                except hou.OperationFailed:  # Driven by an expression
+                    code = parm.evalAsString()
+                if code.strip():
+                    addCodeStats(data, code, code_lang)
+            elif parm_class == PARM_STRING:
+                if parm.evalAsString().startswith('http'):
+                    links_to_web += 1
+
+        # Expressions are stored in keyframes, parms without any are skipped
+        keyframes = parm.keyframes()
+        if len(keyframes) > 1:
+            animated += 1
+        elif keyframes and parm_class != PARM_CODE and parmHasExpression(parm):
+            # Segments of animated channels report their functions, such as bezier(), as expressions,
+            # only a single keyframe holds an expression of its own. Code parms are counted as snippets already
+            lang = {
+                hou.exprLanguage.Python: 'python',
+                hou.exprLanguage.Hscript: 'hscript'
+            }[parm.expressionLanguage()]
+            addCodeStats(data, parm.expression(), lang)
+
+            # May refer to a parm that does not exist yet
+            if link_parms is not None:
+                link_parms.append(name)
+
+    addStats(data, {
+        ('parms', 'links_to', 'parms'): links_to_parms,
+        ('parms', 'links_to', 'nodes'): links_to_nodes,
+        ('parms', 'links_to', 'web'): links_to_web,
+        ('parms', 'animated'): animated
+    })
+    return data
+
+
+def gatherNetworkStats(root_node):
+    data = {}
+
     current_update_mode = hou.updateModeSetting()
     hou.setUpdateMode(hou.updateMode.Manual)
 
+    file_paths = []
+    parm_index = ParmClassIndex()
     for node in root_node.allSubChildren():
-        data['nodes']['total'] += 1
+        addStats(data, nodeStats(node, file_paths, parm_index))
 
-        if node.isNetwork():
-            data['nodes']['subnetworks'] += 1
+    hou.setUpdateMode(current_update_mode)
 
-        if not node.isEditable():
-            data['nodes']['inside_locked'] += 1
+    addFileStats(data, file_paths, probePaths(file_paths))
 
-        depth = node.path().count('/') - 1
-        max_depth = data['nodes']['max_depth']
-        data['nodes']['max_depth'] = max(depth, max_depth)
+    return nestedStats(data)
 
-        for parm in node.parms():
-            if parm.getReferencedParm() != parm:
-                data['parms']['links_to']['parms'] += 1
 
-            parm_template = parm.parmTemplate()
-            if isinstance(parm_template, hou.StringParmTemplate):
-                string_type = parm_template.stringType()
-                path = parm.evalAsString()
-                if string_type == hou.stringParmType.NodeReference:
-                    try:
-                        if parm.evalAsNode() is not None:
-                            data['parms']['links_to']['nodes'] += 1
-                    except hou.TypeError:
-                        pass
-                elif string_type == hou.stringParmType.NodeReferenceList:
-                    data['parms']['links_to']['nodes'] += len(parm.evalAsNodes())
-                elif string_type == hou.stringParmType.FileReference:
-                    if os.path.exists(path):
-                        if os.path.isdir(path):
-                            data['parms']['links_to']['folders'] += 1
-                        else:  # os.path.isfile(path)
-                            data['parms']['links_to']['files'] += 1
-                elif path.startswith('http'):
-                    data['parms']['links_to']['web'] += 1
-
-                if parmHasExpression(parm):
-                    lang = {
-                        hou.exprLanguage.Python: 'python',
-                        hou.exprLanguage.Hscript: 'hscript'
-                    }[parm.expressionLanguage()]
-                    expr = parm.expression()
-                    data['code'][lang]['total'] += 1
-                    data['code'][lang]['lines'] += expr.count('\n')
-                    data['code'][lang]['empty'] += expr.count('\n\n')
-                    for line in expr.split('\n'):
-                        line = line.lstrip()
-                        if lang == 'python' and line.startswith('#'):
-                            data['code'][lang]['comments'] += 1
-                        elif line.startswith('//'):
-                            data['code'][lang]['comments'] += 1
-
-            if len(parm.keyframes()) > 1:
-                data['parms']['animated'] += 1
+NODE_EVENT_TYPES = (hou.nodeEventType.ParmTupleChanged, hou.nodeEventType.NameChanged)
+NETWORK_EVENT_TYPES = NODE_EVENT_TYPES + (hou.nodeEventType.ChildCreated, hou.nodeEventType.ChildDeleted)
 
-    hou.setUpdateMode(current_update_mode)
 
-    return data
+class NetworkStatsCache(object):
+    """
+    Per-node contributions to the statistics of a network, kept up to date with node event callbacks.
+    Only nodes changed since the last update are gathered again, and only the totals
+    of their ancestors are summed again.
+    """
+
+    def __init__(self, root_node):
+        self._root_node = root_node
+        self._root_id = root_node.sessionId()
+
+        # Sparse contributions without file links, see nodeStats()
+        self._contributions = {}
+
+        # Files can change without any node event, their paths are kept and checked on every update
+        self._file_paths = {}
+        self._file_stats = {}
+        self._parents = {}
+        self._children = {}
+        self._depths = {}
+        self._names = {}
+
+        # Sparse totals of network contents
+        self._subnetwork_stats = {}
+
+        self._parm_index = ParmClassIndex()
+        self._dirty = set()
+        self._stale = set()  # Networks with changed children, their totals are summed again
+        self._linking = set()  # Nodes with node or parm references, resolved or not, affected by other nodes
+        self._prune = False
+        self._watched = {}
+
+        # Deeper nodes are found while gathering, inside the interruptible operation
+        self._watch(root_node)
+        for node in root_node.children():
+            self._dirty.add(node.sessionId())
+
+    def rootNode(self):
+        return self._root_node
+
+    def _watch(self, node):
+        event_types = NETWORK_EVENT_TYPES if node.isNetwork() else NODE_EVENT_TYPES
+        try:
+            node.addEventCallback(event_types, self._onNodeEvent)
+        except hou.OperationFailed:
+            return
+        self._watched[node.sessionId()] = event_types
+
+    def _onNodeEvent(self, event_type, **kwargs):
+        node = kwargs['node']
+        if event_type == hou.nodeEventType.ChildCreated:
+            # Contents of the new node, e.g. pasted networks, are found when it is gathered
+            self._dirty.add(kwargs['child_node'].sessionId())
+            self._dirty.update(self._linking)
+        elif event_type == hou.nodeEventType.ChildDeleted:
+            try:
+                self._forget(kwargs['child_node'].sessionId())
+            except hou.ObjectWasDeleted:
+                # Dropped on the next update
+                self._prune = True
+            self._dirty.update(self._linking)
+        elif event_type == hou.nodeEventType.NameChanged:
+            self._dirty.add(node.sessionId())
+            self._dirty.update(self._linking)
+        elif node != self._root_node:
+            self._dirty.add(node.sessionId())
+
+    def isComplete(self):
+        return not self._dirty
+
+    def _pruneDeleted(self):
+        for session_id in set(self._contributions) | set(self._watched):
+            if hou.nodeBySessionId(session_id) is None:
+                self._forget(session_id)
+        self._prune = False
+
+    def _forget(self, session_id):
+        """Drops the node and everything inside it."""
+        for child_id in self._children.pop(session_id, ()):
+            self._forget(child_id)
+
+        parent_id = self._parents.pop(session_id, None)
+        if parent_id is not None:
+            self._children.get(parent_id, set()).discard(session_id)
+            self._stale.add(parent_id)
+
+        self._contributions.pop(session_id, None)
+        self._file_paths.pop(session_id, None)
+        self._file_stats.pop(session_id, None)
+        self._subnetwork_stats.pop(session_id, None)
+        self._depths.pop(session_id, None)
+        self._names.pop(session_id, None)
+        self._dirty.discard(session_id)
+        self._linking.discard(session_id)
+        self._watched.pop(session_id, None)
+
+    def _gather(self, nodes, probe_results, pool):
+        """
+        Gathers contributions of the nodes, checking file paths not yet in probe_results in parallel.
+        Nodes met for the first time are watched.
+        Returns (previous contribution, contribution) pairs, both including file links,
+        and session ids of children found in new nodes.
+        """
+        found_ids = []
+        gathered = []
+        file_paths = []
+        for node in nodes:
+            if node.sessionId() not in self._watched:
+                self._watch(node)
+                found_ids.extend(child.sessionId() for child in node.children())
+
+            node_file_paths = []
+            link_parms = []
+            stats = nodeStats(node, node_file_paths, self._parm_index, link_parms)
+            gathered.append((node, stats, node_file_paths, link_parms))
+            file_paths.extend(node_file_paths)
+
+        probe_results.update(probePaths([path for path in file_paths if path not in probe_results], pool))
+
+        changes = []
+        for node, stats, node_file_paths, link_parms in gathered:
+            session_id = node.sessionId()
+            old_stats = dict(self._contributions.get(session_id, {}))
+            addStats(old_stats, self._file_stats.get(session_id, {}))
+
+            self._contributions[session_id] = stats
+            self._setFileLinks(session_id, node_file_paths, probe_results)
+
+            new_stats = dict(stats)
+            addStats(new_stats, self._file_stats.get(session_id, {}))
+            changes.append((old_stats, new_stats))
+
+            parent_id = node.parent().sessionId()
+            self._parents[session_id] = parent_id
+            self._children.setdefault(parent_id, set()).add(session_id)
+            self._depths[session_id] = stats[('nodes', 'max_depth')]
+            self._names[session_id] = node.name()
+            self._stale.add(parent_id)
+
+            if link_parms:
+                self._linking.add(session_id)
+            else:
+                self._linking.discard(session_id)
+
+        return changes, found_ids
+
+    def _setFileLinks(self, session_id, file_paths, probe_results):
+        """Stores the file paths of the node and their link counts, returns the previous counts."""
+        old_file_stats = self._file_stats.pop(session_id, {})
+        self._file_paths.pop(session_id, None)
+        if file_paths:
+            file_stats = {}
+            addFileStats(file_stats, file_paths, probe_results)
+            self._file_paths[session_id] = file_paths
+            if file_stats:
+                self._file_stats[session_id] = file_stats
+        return old_file_stats
+
+    def _checkFiles(self, probe_results, pool, data):
+        """
+        Checks the unique paths of all nodes not yet in probe_results and updates the file link counts
+        of nodes whose files were created or deleted, also in the partial totals in data.
+        """
+        paths = set()
+        for file_paths in self._file_paths.values():
+            paths.update(file_paths)
+        probe_results.update(probePaths([path for path in paths if path not in probe_results], pool))
+
+        for session_id, file_paths in list(self._file_paths.items()):
+            old_file_stats = self._setFileLinks(session_id, file_paths, probe_results)
+            file_stats = self._file_stats.get(session_id, {})
+            if file_stats != old_file_stats:
+                subtractStats(data, old_file_stats)
+                addStats(data, file_stats)
+                self._stale.add(self._parents[session_id])
+
+    def stats(self, chunk_size=STATS_CHUNK_SIZE, callback=None):
+        """
+        Gathers dirty nodes in chunks, calling callback with the partial statistics after each chunk.
+        The operation can be interrupted by the user, unprocessed nodes then stay dirty until the next call.
+        Returns sparse totals of the root node contents.
+        """
+        if self._prune:
+            self._pruneDeleted()
+
+        # File checks are shared by all chunks of this update, each unique path is checked once
+        probe_results = {}
+        pool = ThreadPool(FILE_PROBE_THREADS)
+
+        # Partial totals start from the last update and follow each changed contribution,
+        # the only pass over the tree is the bottom-up one in _aggregate()
+        data = dict(self.subnetworkStats())
+        queue = deque(self._dirty)
+
+        current_update_mode = hou.updateModeSetting()
+        hou.setUpdateMode(hou.updateMode.Manual)
+
+        try:
+            with hou.InterruptableOperation('Gathering network statistics', open_interrupt_dialog=True) as operation:
+                processed_count = 0
+                while queue:
+                    nodes = []
+                    for _ in range(min(chunk_size, len(queue))):
+                        session_id = queue.popleft()
+                        self._dirty.discard(session_id)
+
+                        node = hou.nodeBySessionId(session_id)
+                        if node is None:
+                            self._forget(session_id)
+                        elif node != self._root_node:
+                            nodes.append(node)
+                        processed_count += 1
+
+                    changes, found_ids = self._gather(nodes, probe_results, pool)
+                    for old_stats, stats in changes:
+                        subtractStats(data, old_stats)
+                        addStats(data, stats)
+
+                    for session_id in found_ids:
+                        if session_id not in self._dirty:
+                            self._dirty.add(session_id)
+                            queue.append(session_id)
+
+                    if callback is not None:
+                        callback(data)
+
+                    # The total grows as networks are opened. Raises hou.OperationInterrupted if cancelled
+                    operation.updateProgress(processed_count / float(processed_count + len(queue)))
+
+                # Files of unchanged nodes are checked again as well
+                self._checkFiles(probe_results, pool, data)
+                if callback is not None:
+                    callback(data)
+        except hou.OperationInterrupted:
+            pass
+        finally:
+            hou.setUpdateMode(current_update_mode)
+            pool.close()
+            pool.join()
+
+        self._aggregate()
+        return self.subnetworkStats()
+
+    def _aggregate(self):
+        """
+        Sums the totals of stale networks and their ancestors again, deepest first,
+        each from the contributions and totals of its direct children.
+        """
+        networks = set()
+        for session_id in self._stale:
+            while session_id is not None and session_id not in networks:
+                networks.add(session_id)
+                session_id = self._parents.get(session_id)
+        self._stale.clear()
+
+        # The root node is summed last
+        root_depth = float('-inf')
+        for session_id in sorted(networks, key=lambda session_id: self._depths.get(session_id, root_depth),
+                                 reverse=True):
+            stats = {}
+            for child_id in self._children.get(session_id, ()):
+                addStats(stats, self._contributions[child_id])
+                addStats(stats, self._file_stats.get(child_id, {}))
+                child_stats = self._subnetwork_stats.get(child_id)
+                if child_stats is not None:
+                    addStats(stats, child_stats)
+
+            if stats:
+                self._subnetwork_stats[session_id] = stats
+            else:
+                self._subnetwork_stats.pop(session_id, None)
+
+    def nodeName(self, session_id):
+        return self._names.get(session_id)
+
+    def subnetworkStats(self, session_id=None):
+        """Sparse totals of the network contents, the root node is used by default."""
+        if session_id is None:
+            session_id = self._root_id
+        return self._subnetwork_stats.get(session_id) or {}
+
+    def childNetworks(self, session_id=None):
+        """Session ids of child networks with contents."""
+        if session_id is None:
+            session_id = self._root_id
+        return tuple(child_id for child_id in self._children.get(session_id, ())
+                     if child_id in self._subnetwork_stats)
+
+    def close(self):
+        for session_id, event_types in self._watched.items():
+            node = hou.nodeBySessionId(session_id)
+            if node is not None:
+                try:
+                    node.removeEventCallback(event_types, self._onNodeEvent)
+                except hou.OperationFailed:
+                    pass
+        self._watched.clear()
 
 
 class NetworkStatsModel(QAbstractItemModel):
     def __init__(self, parent=None):
         super(NetworkStatsModel, self).__init__(parent)
 
-        self._data = StatItem()
-
-    def updateData(self, node):
-        self.beginResetModel()
-        data = gatherNetworkStats(node)
         self._data = StatItem(None, None,
                               [
                                   StatItem('Nodes', None,
                                            [
-                                               StatItem('Total', data['nodes']['total']),
-                                               StatItem('Subnetworks', data['nodes']['subnetworks']),
-                                               StatItem('Inside Locked', data['nodes']['inside_locked']),
-                                               StatItem('Maximum Depth', data['nodes']['max_depth'])
+                                               StatItem('Total', key=('nodes', 'total')),
+                                               StatItem('Subnetworks', key=('nodes', 'subnetworks')),
+                                               StatItem('Inside Locked', key=('nodes', 'inside_locked')),
+                                               StatItem('Maximum Depth', key=('nodes', 'max_depth'))
                                            ]),
                                   StatItem('Parameters', None,
                                            [
-                                               StatItem('Animated', data['parms']['animated']),
+                                               StatItem('Animated', key=('parms', 'animated')),
                                                StatItem('Links to', None,
                                                         [
-                                                            StatItem('parameters', data['parms']['links_to']['parms']),
-                                                            StatItem('nodes', data['parms']['links_to']['nodes']),
-                                                            StatItem('folders', data['parms']['links_to']['folders']),
-                                                            StatItem('files', data['parms']['links_to']['files']),
-                                                            StatItem('web', data['parms']['links_to']['web'])
+                                                            StatItem('parameters', key=('parms', 'links_to', 'parms')),
+                                                            StatItem('nodes', key=('parms', 'links_to', 'nodes')),
+                                                            StatItem('folders', key=('parms', 'links_to', 'folders')),
+                                                            StatItem('files', key=('parms', 'links_to', 'files')),
+                                                            StatItem('web', key=('parms', 'links_to', 'web'))
                                                         ])
-                                           ])
-                                  # Todo: code stats section
+                                           ]),
+                                  StatItem('Code', None,
+                                           [
+                                               self._codeItem('Python', 'python'),
+                                               self._codeItem('HScript', 'hscript'),
+                                               self._codeItem('VEX', 'vex'),
+                                               self._codeItem('OpenCL', 'opencl')
+                                           ]),
+                                  StatItem('Subnetworks', None, [])
                               ])
-        self.endResetModel()
+        self._subnetworks_item = self._data[-1]
+        self._cache = None
+
+    @staticmethod
+    def _codeItem(text, lang):
+        return StatItem(text, None,
+                        [
+                            StatItem('Snippets', key=('code', lang, 'total')),
+                            StatItem('Lines', key=('code', lang, 'lines')),
+                            StatItem('Empty Lines', key=('code', lang, 'empty')),
+                            StatItem('Comments', key=('code', lang, 'comments'))
+                        ])
+
+    def updateData(self, node):
+        """Returns False if the update was interrupted and the values are partial."""
+        if self._cache is None or self._cache.rootNode() != node:
+            self.clearCache()
+            self._cache = NetworkStatsCache(node)
+
+        data = self._cache.stats(callback=self._onPartialStats)
+        self.setStats(data)
+        self._updateSubnetworks()
+        return self._cache.isComplete()
+
+    def _onPartialStats(self, data):
+        self.setStats(data)
+
+        # Let the view repaint between chunks
+        QCoreApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
+
+    def setStats(self, data):
+        self._setItemValues(self._data, data)
+
+    def _setItemValues(self, parent_item, data):
+        for item in parent_item:
+            if item.key is not None:
+                value = item.valueFromStats(data)
+                if value != item.value:
+                    item.value = value
+                    index = self.createIndex(item.index, 1, item)
+                    self.dataChanged.emit(index, index, [Qt.DisplayRole])
+            self._setItemValues(item, data)
+
+    def _subnetworkItems(self, parent_id=None):
+        total = self._cache.subnetworkStats().get(('nodes', 'total')) or 1
+        items = []
+        for session_id in self._cache.childNetworks(parent_id):
+            count = self._cache.subnetworkStats(session_id).get(('nodes', 'total'), 0)
+            items.append(SubnetworkItem(session_id, self._cache.nodeName(session_id), count,
+                                        100.0 * count / total,
+                                        bool(self._cache.childNetworks(session_id))))
+        items.sort(key=lambda item: int(item.value), reverse=True)
+        return items
+
+    def _updateSubnetworks(self):
+        parent = self.createIndex(self._subnetworks_item.index, 0, self._subnetworks_item)
+
+        # Breakdown rows are built again from the top level, deeper rows on expand
+        if len(self._subnetworks_item):
+            self.beginRemoveRows(parent, 0, len(self._subnetworks_item) - 1)
+            self._subnetworks_item.setChildItems([])
+            self.endRemoveRows()
+
+        items = self._subnetworkItems()
+        if items:
+            self.beginInsertRows(parent, 0, len(items) - 1)
+            self._subnetworks_item.setChildItems(items)
+            self.endInsertRows()
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+
+        item = parent.internalPointer()
+        return isinstance(item, SubnetworkItem) and item.has_subnetworks and not item.fetched
+
+    def fetchMore(self, parent):
+        item = parent.internalPointer()
+        item.fetched = True
+
+        items = self._subnetworkItems(item.session_id)
+        if items:
+            self.beginInsertRows(parent, 0, len(items) - 1)
+            item.setChildItems(items)
+            self.endInsertRows()
+
+    def clearCache(self):
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
 
     def hasChildren(self, parent):
         if not parent.isValid():
             return True
 
-        return bool(parent.internalPointer())
+        item = parent.internalPointer()
+        if isinstance(item, SubnetworkItem):
+            return item.has_subnetworks
+
+        return bool(item)
 
     def parent(self, index):
         if not index.isValid():
             return QModelIndex()
 
-        item = index.internalPointer()
-        if item.text is None:
+        parent_item = index.internalPointer().parent
+        if parent_item is None or parent_item is self._data:
             return QModelIndex()
 
-        return self.createIndex(item.index, 0, item.parent)
+        return self.createIndex(parent_item.index, 0, parent_item)
 
     def columnCount(self, parent):
-        return 2
+        return 3
 
     def rowCount(self, parent):
         if not parent.isValid():
@@ -260,7 +916,11 @@ class NetworkStatsModel(QAbstractItemModel):
         elif column == 1:
             if role == Qt.DisplayRole:
                 return item.value
-        # Todo: column 3 - percentage
+        elif column == 2:
+            if role == Qt.DisplayRole:
+                return item.percentage
+            elif role == Qt.ToolTipRole and item.percentage is not None:
+                return 'Share of all nodes'
 
 
 class NetworkStatsView(QTreeView):
@@ -276,13 +936,21 @@ class NetworkStatsView(QTreeView):
 
         self.setUniformRowHeights(True)
 
-        self.setRootIsDecorated(False)
-        self.setStyleSheet('QTreeView::branch {border-image: none; image: none;}')
-        self.setItemsExpandable(False)
-
         model = NetworkStatsModel(self)
         self.setModel(model)
 
+    def expandSections(self, parent=QModelIndex()):
+        """Expands all statistics, subnetworks stay collapsed until expanded by the user."""
+        model = self.model()
+        for row in range(model.rowCount(parent)):
+            index = model.index(row, 0, parent)
+            if isinstance(index.internalPointer(), SubnetworkItem):
+                continue
+
+            if model.hasChildren(index):
+                self.expand(index)
+                self.expandSections(index)
+
 
 class NetworkStatsWindow(QDialog):
     def __init__(self, parent=hou.qt.mainWindow()):
@@ -295,13 +963,35 @@ class NetworkStatsWindow(QDialog):
         self._stats_view = NetworkStatsView()
         layout.addWidget(self._stats_view)
 
+        self._node = None
+
     def updateData(self, node):
-        self._stats_view.model().updateData(node)
-        self._stats_view.expandAll()
+        self._node = node
+        self._stats_view.expandSections()
+        title = 'TDK: Network Statistics: ' + node.path()
+        self.setWindowTitle(title)
+        if not self._stats_view.model().updateData(node):
+            self.setWindowTitle(title + ' (Interrupted, press F5 to continue)')
+        self._stats_view.expandSections()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Refresh):
+            if self._node is not None:
+                self.updateData(self._node)
+        else:
+            super(NetworkStatsWindow, self).keyPressEvent(event)
+
+    def hideEvent(self, event):
+        # Closing, Esc and reject() all hide the window, minimizing is spontaneous and keeps listening
+        if not event.spontaneous():
+            self._stats_view.model().clearCache()
+        super(NetworkStatsWindow, self).hideEvent(event)
 
 
 def showStatsForNode(node, **kwargs):
+    if isinstance(getattr(hou.session, 'window', None), NetworkStatsWindow):
+        hou.session.window.close()
+
     hou.session.window = NetworkStatsWindow()
-    hou.session.window.setWindowTitle('TDK: Network Statistics: ' + node.path())
-    hou.session.window.updateData(node)
     hou.session.window.show()
+    hou.session.window.updateData(node)
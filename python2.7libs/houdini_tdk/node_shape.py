@@ -18,8 +18,10 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from __future__ import print_function
 
+import itertools
 import json
 import os
+from collections import OrderedDict
 
 try:
     from PyQt5.QtWidgets import *
@@ -34,6 +36,8 @@ except ImportError:
 
 import hou
 
+from .lru_cache import LRUCache
+
 
 class BoundingRectF(QRectF):
     def __init__(self, *args):
@@ -111,13 +115,210 @@ class BoundingRectF(QRectF):
 
 EXCLUDED_SHAPES = ('vop', 'task', 'shop', 'cop2', 'subnet_input')
 
+SHAPE_CACHE_SIZE = 256
+
+_outline_keys = itertools.count(1)
+
+# Simplification tolerances in the unit box, from coarse to fine
+LOD_TOLERANCES = (0.02, 0.01, 0.005, 0.0025)
+LOD_MIN_POINT_COUNT = 16
+
+# Maximum outline deviation in pixels that is still invisible
+LOD_MAX_ERROR = 0.5
+
+
+def normalizedShapeName(name):
+    return name.replace(' ', '_').lower()
+
+
+def readShapeFile(file_path):
+    """
+    Reads the shape file without touching Qt, so it can be called from worker threads.
+    Returns the file modification time and the parsed JSON data.
+    """
+    try:
+        mtime = os.path.getmtime(file_path)
+        with open(file_path) as file:
+            return mtime, json.load(file)
+    except (IOError, OSError):
+        return None, None
+    except ValueError:
+        return mtime, None
+
+
+def simplifyPolyline(points, tolerance):
+    """Douglas-Peucker simplification of a sequence of (x, y) tuples."""
+    count = len(points)
+    if count < 3:
+        return list(points)
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx = bx - ax
+        dy = by - ay
+        length_sq = dx * dx + dy * dy
+
+        max_distance_sq = 0
+        farthest = None
+        for index in range(first + 1, last):
+            px, py = points[index]
+            if length_sq:
+                t = min(max(((px - ax) * dx + (py - ay) * dy) / length_sq, 0), 1)
+                distance_sq = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            else:
+                distance_sq = (px - ax) ** 2 + (py - ay) ** 2
+            if distance_sq > max_distance_sq:
+                max_distance_sq = distance_sq
+                farthest = index
+
+        if farthest is not None and max_distance_sq > tolerance_sq:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+# Shape file entries exposed as parts
+PART_GROUPS = ('inputs', 'outputs', 'flags')
+
+
+def _partPoints(part_data):
+    """Point list of a shape part, stored either directly or under an "outline" key."""
+    if isinstance(part_data, dict):
+        part_data = part_data.get('outline')
+    if isinstance(part_data, list):
+        return part_data
+    return ()
+
+
+class _NodeShapeParts(object):
+    """
+    Shape parts other than the outline, shared between copies of a shape.
+    Each part is converted from the JSON data to a normalized polygon the first time it is requested,
+    the file is read again only if the shape was built without its data (e.g. from the bundle).
+    """
+
+    def __init__(self, file_path=None, shape_data=None, source_bounds=None, outline_values=None):
+        self.file_path = file_path
+        self.data = shape_data
+        self.source_bounds = QRectF(source_bounds) if source_bounds is not None else QRectF()
+        self.polygons = {}
+
+        # Flat x, y values of the normalized outline, turned into a polygon on first use
+        self.outline_values = outline_values
+        self._outline = None
+
+    def outline(self):
+        if self._outline is None:
+            values = self.outline_values or ()
+            self._outline = QPolygonF([QPointF(values[i], values[i + 1]) for i in range(0, len(values), 2)])
+            self.outline_values = None
+        return self._outline
+
+    def _shapeData(self):
+        if self.data is None:
+            self.data = {}
+            if self.file_path:
+                _, shape_data = readShapeFile(self.file_path)
+                if isinstance(shape_data, dict):
+                    self.data = {group: shape_data[group] for group in PART_GROUPS if group in shape_data}
+        return self.data
+
+    def names(self, group):
+        part_data = self._shapeData().get(group)
+        if isinstance(part_data, dict):
+            return tuple(sorted(part_data.keys()))
+        return ()
+
+    def polygon(self, group, name=None):
+        key = (group, name)
+        polygon = self.polygons.get(key)
+        if polygon is None:
+            part_data = self._shapeData().get(group)
+            if name is not None:
+                part_data = part_data.get(name) if isinstance(part_data, dict) else None
+
+            points = QPolygonF([QPointF(x, -y) for x, y in _partPoints(part_data)])
+            polygon = NodeShape._rectToRectTransform(self.source_bounds, QRectF(0, 0, 1, 1)).map(points)
+            self.polygons[key] = polygon
+        return polygon
+
+
+class NodeShapeRegistry(object):
+    """Maps shape names to files found in config/NodeShapes on the Houdini path."""
+    _paths = None
+
+    @staticmethod
+    def refresh():
+        paths = OrderedDict()
+        for file_path in hou.findFilesWithExtension('json', 'config/NodeShapes'):
+            name, _ = os.path.splitext(os.path.basename(file_path))
+            # The first file on the Houdini path wins
+            paths.setdefault(name.lower(), file_path)
+        NodeShapeRegistry._paths = paths
+
+    @staticmethod
+    def register(file_path):
+        """Adds a shape file that is not on the Houdini path."""
+        name, _ = os.path.splitext(os.path.basename(file_path))
+        NodeShapeRegistry._shapePaths()[name.lower()] = file_path
+
+    @staticmethod
+    def _shapePaths():
+        if NodeShapeRegistry._paths is None:
+            NodeShapeRegistry.refresh()
+        return NodeShapeRegistry._paths
+
+    @staticmethod
+    def path(name):
+        return NodeShapeRegistry._shapePaths().get(normalizedShapeName(name))
+
+    @staticmethod
+    def contains(name):
+        return normalizedShapeName(name) in NodeShapeRegistry._shapePaths()
+
+    @staticmethod
+    def names():
+        return tuple(NodeShapeRegistry._shapePaths().keys())
+
+    @staticmethod
+    def paths():
+        return tuple(NodeShapeRegistry._shapePaths().values())
+
 
 class NodeShape(object):
+    # Parsed shapes by (file path, modification time)
+    _cache = LRUCache(SHAPE_CACHE_SIZE)
+
+    # Shapes from the bundle by file path, as (modification time, shape), not limited in size
+    _bundle_shapes = {}
 
     def __init__(self):
         self.__valid = False
         self.__name = None
-        self.__points = ()
+
+        # Outline normalized to the unit box, shared between copies. Empty until a shape is loaded,
+        # None for shapes from fromOutlineValues() until the polygon is built from the stored values
+        self.__outline = QPolygonF()
+
+        self.__cache_key = 0
+
+        # Simplified outlines by tolerance, computed on demand and shared between copies
+        self.__lods = {}
+
+        # Current placement of the unit box
+        self.__bounds = QRectF()
+
+        # Inputs, outputs and flags, loaded on demand and shared between copies
+        self.__parts = _NodeShapeParts()
 
     def isValid(self):
         return self.__valid
@@ -128,59 +329,144 @@ class NodeShape(object):
     def name(self):
         return self.__name
 
+    def cacheKey(self):
+        return self.__cache_key
+
+    def boundingRect(self):
+        return QRectF(self.__bounds)
+
+    def normalizedOutline(self):
+        if self.__outline is None:
+            self.__outline = self.__parts.outline()
+        return self.__outline
+
+    def isExcluded(self):
+        return self.__name in EXCLUDED_SHAPES
+
     def __copy__(self):
         new = NodeShape()
         new.__name = self.__name
-        new.__points = self.__points
+        new.__outline = self.__outline
+        new.__cache_key = self.__cache_key
+        new.__lods = self.__lods
+        new.__bounds = QRectF(self.__bounds)
+        new.__parts = self.__parts
         new.__valid = self.__valid
         return new
 
     def copy(self):
         return self.__copy__()
 
-    def transformToRect(self, rect, aspect_ratio_mode=Qt.KeepAspectRatio):
-        target_rect = QRectF(rect)
-        bounding_rect = BoundingRectF.fromPoints(self.__points)
+    def _setOutline(self, polygon):
+        bounds = polygon.boundingRect()
+        self.__outline = NodeShape._rectToRectTransform(bounds, QRectF(0, 0, 1, 1)).map(polygon)
+        self.__cache_key = next(_outline_keys)
+        self.__lods = {}
+        self.__bounds = bounds
 
-        target_rect.setSize(bounding_rect.size().scaled(rect.size(), aspect_ratio_mode))
+    def _fittedBounds(self, rect, aspect_ratio_mode=Qt.KeepAspectRatio):
+        target_rect = QRectF(rect)
+        target_rect.setSize(self.__bounds.size().scaled(rect.size(), aspect_ratio_mode))
 
         # Todo: Alignment
         target_rect.moveCenter(rect.center())
 
-        bounding_polygon = QPolygonF(bounding_rect)
-        bounding_polygon.takeLast()
+        return target_rect
 
-        target_polygon = QPolygonF(target_rect)
-        target_polygon.takeLast()
+    @staticmethod
+    def _rectToRectTransform(source_rect, target_rect):
+        scale_x = target_rect.width() / source_rect.width() if source_rect.width() else 1.0
+        scale_y = target_rect.height() / source_rect.height() if source_rect.height() else 1.0
+        return QTransform(scale_x, 0, 0, scale_y,
+                          target_rect.left() - source_rect.left() * scale_x,
+                          target_rect.top() - source_rect.top() * scale_y)
 
-        return QTransform.quadToQuad(bounding_polygon, target_polygon)
+    def transformToRect(self, rect, aspect_ratio_mode=Qt.KeepAspectRatio):
+        return NodeShape._rectToRectTransform(self.__bounds, self._fittedBounds(rect, aspect_ratio_mode))
 
     def fitInRect(self, rect, aspect_ratio_mode=Qt.KeepAspectRatio):
-        transform = self.transformToRect(rect, aspect_ratio_mode)
-        self.__points = tuple(transform.map(point) for point in self.__points)
+        self.__bounds = self._fittedBounds(rect, aspect_ratio_mode)
 
     def fittedInRect(self, rect, aspect_ratio_mode=Qt.KeepAspectRatio):
         new = self.copy()
         new.fitInRect(rect, aspect_ratio_mode)
         return new
 
-    def painterPath(self):
-        path = QPainterPath(self.__points[0])
+    def simplifiedOutline(self, tolerance):
+        outline = self.__lods.get(tolerance)
+        if outline is None:
+            points = simplifyPolyline([(point.x(), point.y()) for point in self.normalizedOutline()], tolerance)
+            outline = QPolygonF([QPointF(x, y) for x, y in points])
+            self.__lods[tolerance] = outline
+        return outline
 
-        for point in self.__points:
-            path.lineTo(point)
-        path.closeSubpath()
+    def outlineForSize(self, size):
+        """Returns the coarsest normalized outline that looks the same at the given size in pixels."""
+        outline = self.normalizedOutline()
+        if outline.size() < LOD_MIN_POINT_COUNT:
+            return outline
+
+        for tolerance in LOD_TOLERANCES:
+            if tolerance * size <= LOD_MAX_ERROR:
+                return self.simplifiedOutline(tolerance)
+
+        return outline
+
+    def inputs(self):
+        return self.__parts.polygon('inputs')
+
+    def outputs(self):
+        return self.__parts.polygon('outputs')
+
+    def flagNames(self):
+        return self.__parts.names('flags')
+
+    def flag(self, name):
+        return self.__parts.polygon('flags', name)
+
+    def _pathFromNormalized(self, polygon):
+        bounds = self.__bounds
+        transform = QTransform(bounds.width(), 0, 0, bounds.height(), bounds.left(), bounds.top())
+
+        path = QPainterPath()
+        if not polygon.isEmpty():
+            path.addPolygon(transform.map(polygon))
+            path.closeSubpath()
 
         return path
 
+    def painterPath(self):
+        bounds = self.__bounds
+        return self._pathFromNormalized(self.outlineForSize(max(bounds.width(), bounds.height())))
+
+    def partPainterPath(self, polygon):
+        """Places a normalized part polygon, such as inputs() or flag(name), like the outline."""
+        return self._pathFromNormalized(polygon)
+
     @staticmethod
-    def fromFile(file_path, allow_excluded=False):
+    def fromNormalizedOutline(name, outline, bounds, valid=True, file_path=None):
         shape = NodeShape()
+        shape.__name = name
+        shape.__outline = outline
+        shape.__cache_key = next(_outline_keys)
+        shape.__lods = {}
+        shape.__bounds = QRectF(bounds)
+        shape.__parts = _NodeShapeParts(file_path, None, bounds)
+        shape.__valid = valid
+        return shape
 
-        try:
-            with open(file_path) as file:
-                shape_data = json.load(file)
-        except IOError:
+    @staticmethod
+    def fromOutlineValues(name, outline_values, bounds, valid=True, file_path=None):
+        """Like fromNormalizedOutline(), but the polygon is built from flat x, y values when first needed."""
+        shape = NodeShape.fromNormalizedOutline(name, None, bounds, valid, file_path)
+        shape.__parts.outline_values = outline_values
+        return shape
+
+    @staticmethod
+    def fromData(file_path, shape_data):
+        shape = NodeShape()
+
+        if not shape_data:
             return shape
 
         if 'name' in shape_data:
@@ -188,44 +474,110 @@ class NodeShape(object):
         else:
             shape.__name, _ = os.path.splitext(os.path.basename(file_path))
 
-        if not allow_excluded and shape.__name in EXCLUDED_SHAPES:
+        if 'outline' not in shape_data:
             return shape
 
-        if not shape_data or 'outline' not in shape_data:
-            return shape
+        shape._setOutline(QPolygonF([QPointF(x, -y) for x, y in shape_data['outline']]))
 
-        shape.__points = tuple(QPointF(x, -y) for x, y in shape_data['outline'])
+        # Parts are parsed from the data only when requested, the outline points are not kept
+        part_data = {group: shape_data[group] for group in PART_GROUPS if group in shape_data}
+        shape.__parts = _NodeShapeParts(file_path, part_data, shape.__bounds)
 
         shape.__valid = True
         return shape
 
+    @staticmethod
+    def clearCache():
+        NodeShape._cache.clear()
+        NodeShape._bundle_shapes.clear()
+
+    @staticmethod
+    def evictFile(file_path):
+        for key in NodeShape._cache.keys():
+            if key[0] == file_path:
+                NodeShape._cache.pop(key)
+        NodeShape._bundle_shapes.pop(file_path, None)
+
+    @staticmethod
+    def cacheShape(file_path, mtime, shape):
+        NodeShape._cache.put((file_path, mtime), shape)
+
+    @staticmethod
+    def cacheBundleShape(file_path, mtime, shape):
+        NodeShape._bundle_shapes[file_path] = mtime, shape
+
+    @staticmethod
+    def _handOut(cached_shape, allow_excluded):
+        if not allow_excluded and cached_shape.__name in EXCLUDED_SHAPES:
+            shape = NodeShape()
+            shape.__name = cached_shape.__name
+            return shape
+
+        # Copies share the normalized outline, fitting only moves their bounds
+        return cached_shape.copy()
+
+    @staticmethod
+    def cachedShape(file_path, mtime, allow_excluded=False):
+        """Returns None if there is no shape parsed from the file with this modification time."""
+        cached_shape = NodeShape._cache.get((file_path, mtime))
+        if cached_shape is None:
+            bundle_mtime, bundle_shape = NodeShape._bundle_shapes.get(file_path, (None, None))
+            if bundle_mtime != mtime:
+                return
+            cached_shape = bundle_shape
+
+        return NodeShape._handOut(cached_shape, allow_excluded)
+
+    @staticmethod
+    def fromCache(file_path, allow_excluded=False):
+        """Returns None if the file has no up to date parsed shape in the cache."""
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            return
+
+        return NodeShape.cachedShape(file_path, mtime, allow_excluded)
+
+    @staticmethod
+    def fromFileData(file_path, mtime, shape_data, allow_excluded=False):
+        """Builds and caches a shape from data read by readShapeFile()."""
+        cached_shape = NodeShape.fromData(file_path, shape_data)
+        NodeShape.cacheShape(file_path, mtime, cached_shape)
+        return NodeShape._handOut(cached_shape, allow_excluded)
+
+    @staticmethod
+    def fromFile(file_path, allow_excluded=False):
+        shape = NodeShape.fromCache(file_path, allow_excluded)
+        if shape is not None:
+            return shape
+
+        mtime, shape_data = readShapeFile(file_path)
+        if mtime is None:
+            return NodeShape()
+
+        return NodeShape.fromFileData(file_path, mtime, shape_data, allow_excluded)
+
     @staticmethod
     def fromName(name, allow_excluded=False):
         if not name:
             return NodeShape()
 
-        name = name.replace(' ', '_').lower()
+        name = normalizedShapeName(name)
+
+        if not allow_excluded and name in EXCLUDED_SHAPES:
+            return NodeShape()
 
-        if allow_excluded and name in EXCLUDED_SHAPES:
+        file_path = NodeShapeRegistry.path(name)
+        if file_path is None:
             return NodeShape()
 
-        file_name = name + '.json'
-        shape_files = hou.findFilesWithExtension('json', 'config/NodeShapes')
-        for file_path in shape_files:
-            if file_name in file_path.lower():
-                return NodeShape.fromFile(file_path)
-        return NodeShape()
+        return NodeShape.fromFile(file_path, allow_excluded)
 
     @staticmethod
     def isValidShape(name):
-        name = name.replace(' ', '_').lower()
+        name = normalizedShapeName(name)
 
         if name in EXCLUDED_SHAPES:
             return False
 
-        file_name = name + '.json'
-        shape_files = hou.findFilesWithExtension('json', 'config/NodeShapes')
-        for file_path in shape_files:
-            if file_name in file_path.lower():
-                return True
-        return False
+        return NodeShapeRegistry.contains(name)
@@ -0,0 +1,145 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import print_function
+
+import json
+import mmap
+import struct
+from array import array
+
+try:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+
+    Signal = pyqtSignal
+except ImportError:
+    from PySide2.QtWidgets import *
+    from PySide2.QtGui import *
+    from PySide2.QtCore import *
+
+import hou
+
+from .node_shape import NodeShape
+from .node_shape_descriptor import NodeShapeDescriptor, cacheDescriptor
+
+# Layout: header, JSON manifest, padding to 8 bytes, normalized outline points as native doubles
+BUNDLE_FILE = '$HOUDINI_USER_PREF_DIR/tdk_node_shapes.bin'
+BUNDLE_MAGIC = b'TDKSHAPE'
+BUNDLE_VERSION = 2
+BUNDLE_HEADER = struct.Struct('<8sII')  # Magic, version, manifest size
+
+DOUBLE_SIZE = array('d').itemsize
+
+
+def _pointsOffset(manifest_size):
+    size = BUNDLE_HEADER.size + manifest_size
+    return size + -size % DOUBLE_SIZE
+
+
+def saveShapeBundle(entries, bundle_file=BUNDLE_FILE):
+    """
+    Writes the bundle from (file path, modification time, shape, descriptor) entries,
+    shapes including the excluded ones.
+    """
+    points = array('d')
+    sources = []
+    shapes = []
+    for file_path, mtime, shape, descriptor in entries:
+        outline = shape.normalizedOutline()
+        offset = len(points)
+        for point in outline:
+            points.append(point.x())
+            points.append(point.y())
+
+        bounds = shape.boundingRect()
+        sources.append([file_path, mtime])
+        shapes.append({
+            'name': shape.name(),
+            'valid': shape.isValid(),
+            'offset': offset,
+            'count': outline.size(),
+            'bounds': [bounds.x(), bounds.y(), bounds.width(), bounds.height()],
+            'descriptor': descriptor.toData() if descriptor is not None else None
+        })
+
+    manifest = json.dumps({'sources': sources, 'shapes': shapes}).encode('utf-8')
+    padding = _pointsOffset(len(manifest)) - BUNDLE_HEADER.size - len(manifest)
+
+    try:
+        with open(hou.expandString(bundle_file), 'wb') as file:
+            file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(manifest)))
+            file.write(manifest)
+            file.write(b'\0' * padding)
+            file.write(points.tobytes() if hasattr(points, 'tobytes') else points.tostring())
+    except IOError:
+        return False
+
+    return True
+
+
+def loadShapeBundle(sources, bundle_file=BUNDLE_FILE):
+    """
+    Makes shapes from the bundle available through NodeShape.cachedShape() if the bundle
+    was built from exactly these (file path, modification time) sources.
+    Outline polygons are built from the stored values only when a shape is drawn.
+    """
+    try:
+        file = open(hou.expandString(bundle_file), 'rb')
+    except IOError:
+        return False
+
+    with file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):  # Empty file
+            return False
+
+        try:
+            magic, version, manifest_size = BUNDLE_HEADER.unpack_from(data, 0)
+            if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                return False
+
+            manifest_end = BUNDLE_HEADER.size + manifest_size
+            manifest = json.loads(data[BUNDLE_HEADER.size:manifest_end].decode('utf-8'))
+
+            if manifest['sources'] != [[file_path, mtime] for file_path, mtime in sources]:
+                return False
+
+            points_offset = _pointsOffset(manifest_size)
+            for (file_path, mtime), entry in zip(sources, manifest['shapes']):
+                start = points_offset + entry['offset'] * DOUBLE_SIZE
+                end = start + entry['count'] * 2 * DOUBLE_SIZE
+                values = array('d')
+                if hasattr(values, 'frombytes'):
+                    values.frombytes(data[start:end])
+                else:
+                    values.fromstring(data[start:end])
+
+                shape = NodeShape.fromOutlineValues(entry['name'], values, QRectF(*entry['bounds']),
+                                                    entry['valid'], file_path)
+                NodeShape.cacheBundleShape(file_path, mtime, shape)
+                if entry['descriptor'] is not None:
+                    cacheDescriptor(file_path, mtime, NodeShapeDescriptor.fromData(entry['descriptor']))
+        except (struct.error, ValueError, KeyError, TypeError):
+            return False
+        finally:
+            data.close()
+
+    return True
@@ -29,12 +29,25 @@ except ImportError:
     from PySide2.QtGui import *
     from PySide2.QtCore import *
 
+from houdini_tdk.lru_cache import LRUCache, pixmapCost
 from houdini_tdk.node_shape_list_model import NodeShapeListModel
 
 qInstallMessageHandler(lambda *args: None)
 
 
+# Maximum size of rendered cells in bytes
+CELL_CACHE_LIMIT = 16 * 1024 * 1024
+
+
 class NodeShapeDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super(NodeShapeDelegate, self).__init__(parent)
+
+        self._cell_cache = LRUCache(CELL_CACHE_LIMIT, pixmapCost)
+
+    def clearCache(self):
+        self._cell_cache.clear()
+
     def sizeHint(self, option, index):
         grid_width = self.parent().gridSize().width()
         if grid_width > 100:
@@ -44,34 +57,62 @@ class NodeShapeDelegate(QStyledItemDelegate):
             width = 100
         return QSize(width, 70)
 
-    def paint(self, painter, option, index):
-        painter.save()
+    def _renderCell(self, painter, option, index, shape):
+        device_pixel_ratio = painter.device().devicePixelRatioF()
+        pixmap = QPixmap(option.rect.size() * device_pixel_ratio)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(Qt.transparent)
 
-        painter.eraseRect(option.rect)
+        cell_painter = QPainter(pixmap)
+        cell_painter.setPen(painter.pen())
+        cell_painter.setFont(painter.font())
 
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.HighQualityAntialiasing)
+        cell_painter.setRenderHint(QPainter.Antialiasing)
+        cell_painter.setRenderHint(QPainter.HighQualityAntialiasing)
 
-        pen_width = painter.pen().width()
-        inner_rect = option.rect.adjusted(pen_width, pen_width, -pen_width, -pen_width)
+        rect = QRect(QPoint(0, 0), option.rect.size())
+        pen_width = cell_painter.pen().width()
+        inner_rect = rect.adjusted(pen_width, pen_width, -pen_width, -pen_width)
         spacing = pen_width * 4
         inner_rect_spaced = inner_rect.adjusted(spacing, spacing, -spacing, -spacing)
 
         if option.state & QStyle.State_Selected:
-            painter.drawRect(inner_rect)
+            cell_painter.drawRect(inner_rect)
 
         if inner_rect_spaced.width() > 30:
-            metrics = painter.fontMetrics()
+            metrics = cell_painter.fontMetrics()
             text_height = metrics.height()
             text = metrics.elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, inner_rect_spaced.width())
-            painter.drawText(inner_rect, Qt.AlignHCenter | Qt.AlignBottom, text)
+            cell_painter.drawText(inner_rect, Qt.AlignHCenter | Qt.AlignBottom, text)
         else:
             text_height = 0
 
         if inner_rect_spaced.width() > 10:
-            shape = index.data(NodeShapeListModel.ShapeRole)
-            painter.setBrush(painter.pen().color().darker())
+            cell_painter.setBrush(cell_painter.pen().color().darker())
             icon_rect = inner_rect_spaced.adjusted(0, 0, 0, -text_height)
-            painter.drawPath(shape.fittedInRect(icon_rect).painterPath())
+            cell_painter.drawPath(shape.fittedInRect(icon_rect).painterPath())
+
+        cell_painter.end()
+        return pixmap
+
+    def paint(self, painter, option, index):
+        shape = index.data(NodeShapeListModel.ShapeRole)
+        pen = painter.pen()
+        key = (shape.cacheKey(),
+               option.rect.width(),
+               option.rect.height(),
+               bool(option.state & QStyle.State_Selected),
+               option.palette.cacheKey(),
+               pen.color().rgba(),
+               pen.width(),
+               painter.font().key())
+
+        pixmap = self._cell_cache.get(key)
+        if pixmap is None:
+            pixmap = self._renderCell(painter, option, index, shape)
+            self._cell_cache.put(key, pixmap)
 
+        painter.save()
+        painter.eraseRect(option.rect)
+        painter.drawPixmap(option.rect.topLeft(), pixmap)
         painter.restore()
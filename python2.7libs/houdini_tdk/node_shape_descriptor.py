@@ -0,0 +1,140 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import print_function
+
+import math
+from array import array
+
+SIGNATURE_SIZE = 32
+
+# Descriptors by file path, as (modification time, descriptor)
+_descriptors = {}
+
+
+def cacheDescriptor(file_path, mtime, descriptor):
+    _descriptors[file_path] = mtime, descriptor
+
+
+def cachedDescriptor(file_path, mtime):
+    cached_mtime, descriptor = _descriptors.get(file_path, (None, None))
+    if cached_mtime == mtime:
+        return descriptor
+
+
+def polygonArea(points):
+    """Signed area of a closed polygon given as (x, y) tuples."""
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+def turningFunction(points, sample_count=SIGNATURE_SIZE):
+    """
+    Tangent angle sampled at equal steps of the normalized perimeter, starting at the first point.
+    Over the full outline the angle grows by 2 * pi.
+    """
+    edges = []
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length:
+            edges.append((length, math.atan2(y2 - y1, x2 - x1)))
+
+    if not edges:
+        return array('d', [0.0] * sample_count)
+
+    # Unwrap angles so turning accumulates along the outline
+    angles = [edges[0][1]]
+    for _, angle in edges[1:]:
+        turn = (angle - angles[-1] + math.pi) % (2 * math.pi) - math.pi
+        angles.append(angles[-1] + turn)
+
+    perimeter = sum(length for length, _ in edges)
+    signature = array('d')
+    edge_index = 0
+    edge_end = edges[0][0] / perimeter
+    for sample in range(sample_count):
+        position = sample / float(sample_count)
+        while position >= edge_end and edge_index < len(edges) - 1:
+            edge_index += 1
+            edge_end += edges[edge_index][0] / perimeter
+        signature.append(angles[edge_index])
+    return signature
+
+
+def turningDistance(signature1, signature2):
+    """
+    Distance between two turning functions, invariant to rotation and to the choice of the start point.
+    """
+    count = len(signature1)
+    mean1 = sum(signature1) / count
+    centered1 = [value - mean1 for value in signature1]
+
+    best = float('inf')
+    for shift in range(count):
+        # Shifting the start point wraps the tail around with one full turn added
+        shifted = [signature2[(index + shift) % count] + (2 * math.pi if index + shift >= count else 0)
+                   for index in range(count)]
+        mean2 = sum(shifted) / count
+        distance = 0.0
+        for value1, value2 in zip(centered1, shifted):
+            distance += (value1 - value2 + mean2) ** 2
+            if distance >= best:
+                break
+        best = min(best, distance)
+    return math.sqrt(best / count)
+
+
+class NodeShapeDescriptor(object):
+    def __init__(self, area=0.0, aspect_ratio=1.0, point_count=0, signature=None):
+        self.area = area
+        self.aspect_ratio = aspect_ratio
+        self.point_count = point_count
+        self.signature = signature or array('d', [0.0] * SIGNATURE_SIZE)
+
+    @staticmethod
+    def fromPoints(points):
+        """Descriptor of an outline given as (x, y) tuples, does not touch Qt and can run in worker threads."""
+        if not points:
+            return NodeShapeDescriptor()
+
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        width = max(xs) - min(xs)
+        height = max(ys) - min(ys)
+
+        area = polygonArea(points)
+        if area < 0:
+            points = points[::-1]
+
+        return NodeShapeDescriptor(abs(area),
+                                   width / height if height else 1.0,
+                                   len(points),
+                                   turningFunction(points))
+
+    def distance(self, other):
+        return turningDistance(self.signature, other.signature)
+
+    def toData(self):
+        return [self.area, self.aspect_ratio, self.point_count, list(self.signature)]
+
+    @staticmethod
+    def fromData(data):
+        area, aspect_ratio, point_count, signature = data
+        return NodeShapeDescriptor(area, aspect_ratio, point_count, array('d', signature))
@@ -51,24 +51,52 @@ class NodeShapeListDialog(QDialog):
         main_layout.setContentsMargins(4, 4, 4, 4)
         main_layout.setSpacing(4)
 
+        top_layout = QHBoxLayout()
+        top_layout.setContentsMargins(0, 0, 0, 0)
+        top_layout.setSpacing(4)
+        main_layout.addLayout(top_layout)
+
         # Filter
         self.filter_field = FilterField()
-        main_layout.addWidget(self.filter_field)
+        top_layout.addWidget(self.filter_field)
+
+        # Sort
+        self.sort_combo = QComboBox()
+        self.sort_combo.setToolTip('Sort by')
+        self.sort_combo.addItem('Default', None)
+        self.sort_combo.addItem('Name', NodeShapeListModel.ShapeNameRole)
+        self.sort_combo.addItem('Aspect Ratio', NodeShapeListModel.AspectRatioRole)
+        self.sort_combo.addItem('Area', NodeShapeListModel.AreaRole)
+        self.sort_combo.addItem('Point Count', NodeShapeListModel.PointCountRole)
+        self.sort_combo.addItem('Similarity', NodeShapeListModel.SimilarityRole)
+        self.sort_combo.currentIndexChanged.connect(self._onSortChanged)
+        top_layout.addWidget(self.sort_combo)
 
         # Node Shape List
+        self._pending_shape_name = None
+
         self.shape_list_model = NodeShapeListModel(self)
+        self.shape_list_model.rowsInserted.connect(self._selectPendingShape)
         self.shape_list_model.updateNodeShapeList()
 
         self.filter_proxy_model = FuzzyFilterProxyModel(self, Qt.DisplayRole)
         self.filter_proxy_model.setSourceModel(self.shape_list_model)
         self.filter_field.textChanged.connect(self.filter_proxy_model.setFilterPattern)
 
+        self.sort_proxy_model = QSortFilterProxyModel(self)
+        self.sort_proxy_model.setSourceModel(self.filter_proxy_model)
+
         self.shape_list_view = NodeShapeListView()
-        self.shape_list_view.setModel(self.filter_proxy_model)
+        self.shape_list_view.setModel(self.sort_proxy_model)
         self.shape_list_view.setItemDelegate(NodeShapeDelegate(self.shape_list_view))
         self.shape_list_view.itemDoubleClicked.connect(self.accept)
         main_layout.addWidget(self.shape_list_view)
 
+        self.show_similar_action = QAction('Show Similar Shapes', self.shape_list_view)
+        self.show_similar_action.triggered.connect(self.showSimilarShapes)
+        self.shape_list_view.addAction(self.show_similar_action)
+        self.shape_list_view.setContextMenuPolicy(Qt.ActionsContextMenu)
+
         # Buttons
         buttons_layout = QHBoxLayout()
         main_layout.addLayout(buttons_layout)
@@ -86,13 +114,53 @@ class NodeShapeListDialog(QDialog):
         self.cancel_button.clicked.connect(self.reject)
         buttons_layout.addWidget(self.cancel_button)
 
+    def setCurrentShapeName(self, name):
+        self._pending_shape_name = name
+        self._selectPendingShape()
+
+    def _selectPendingShape(self):
+        if not self._pending_shape_name:
+            return
+
+        # Shapes are loaded in the background and may not be in the model yet
+        index = self.shape_list_model.indexByName(self._pending_shape_name)
+        index = self.filter_proxy_model.mapFromSource(index)
+        index = self.sort_proxy_model.mapFromSource(index)
+        if index.isValid():
+            self.shape_list_view.setCurrentIndex(index)
+            self._pending_shape_name = None
+
+    def _onSortChanged(self):
+        role = self.sort_combo.currentData()
+        if role is None:
+            self.sort_proxy_model.sort(-1)
+        else:
+            self.sort_proxy_model.setSortRole(role)
+            self.sort_proxy_model.sort(0, Qt.AscendingOrder)
+
+    def showSimilarShapes(self):
+        index = self.shape_list_view.currentIndex()
+        if not index.isValid():
+            return
+
+        self.shape_list_model.setSimilarityReference(index.data(NodeShapeListModel.ShapeNameRole))
+        self.sort_combo.setCurrentIndex(self.sort_combo.findData(NodeShapeListModel.SimilarityRole))
+
     def keyPressEvent(self, event):
         if event.matches(QKeySequence.Find) or event.key() == Qt.Key_F3:
             self.filter_field.setFocus()
             self.filter_field.selectAll()
+        elif event.matches(QKeySequence.Refresh):
+            self.shape_list_model.updateNodeShapeList(rescan=True)
         else:
             super(NodeShapeListDialog, self).keyPressEvent(event)
 
+    def hideEvent(self, event):
+        # The dialog is not shown again once closed or finished
+        if not event.spontaneous():
+            self.shape_list_model.stopUpdates()
+        super(NodeShapeListDialog, self).hideEvent(event)
+
     def enableDialogMode(self):
         self.shape_list_view.setSelectionMode(QAbstractItemView.SingleSelection)
         self.shape_list_view.enableDoubleClickedSignal()
@@ -106,17 +174,16 @@ class NodeShapeListDialog(QDialog):
         window.enableDialogMode()
 
         if name:
-            model = window.shape_list_view.model()
-            for row in range(model.rowCount()):
-                index = model.index(row, 0)
-                if index.data(NodeShapeListModel.ShapeNameRole) == name:
-                    window.shape_list_view.setCurrentIndex(index)
-                    break
+            window.setCurrentShapeName(name)
 
+        shape_name = None
         if window.exec_() and window.shape_list_view.currentIndex().isValid():
-            return window.shape_list_view.currentIndex().data(NodeShapeListModel.ShapeNameRole)
+            shape_name = window.shape_list_view.currentIndex().data(NodeShapeListModel.ShapeNameRole)
+        window.deleteLater()
+        return shape_name
 
 
 def findNodeShape(**kwargs):
     window = NodeShapeListDialog(hou.qt.mainWindow())
+    window.setAttribute(Qt.WA_DeleteOnClose)
     window.show()
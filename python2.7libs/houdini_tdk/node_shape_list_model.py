@@ -18,6 +18,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from __future__ import print_function
 
+import bisect
+import os
+
 try:
     from PyQt5.QtWidgets import *
     from PyQt5.QtGui import *
@@ -29,48 +32,288 @@ except ImportError:
     from PySide2.QtGui import *
     from PySide2.QtCore import *
 
-import hou
+from .node_shape import NodeShape, NodeShapeRegistry, readShapeFile
+from .node_shape_bundle import loadShapeBundle, saveShapeBundle
+from .node_shape_descriptor import NodeShapeDescriptor, cacheDescriptor, cachedDescriptor
+from .node_shape_watcher import NodeShapeWatcher
+
+
+class ShapeLoaderSignals(QObject):
+    # Generation, file path, modification time, shape data, descriptor
+    loaded = Signal(int, object, object, object, object)
+
+
+class ShapeLoader(QRunnable):
+    def __init__(self, generation, file_path, signals):
+        super(ShapeLoader, self).__init__()
+
+        self._generation = generation
+        self._file_path = file_path
+        self._signals = signals
 
-from .node_shape import NodeShape
+    def run(self):
+        mtime, shape_data = readShapeFile(self._file_path)
+
+        # Computed from the raw points, so only cheap work is left to the GUI thread
+        descriptor = None
+        if isinstance(shape_data, dict) and 'outline' in shape_data:
+            descriptor = NodeShapeDescriptor.fromPoints([(x, -y) for x, y in shape_data['outline']])
+
+        self._signals.loaded.emit(self._generation, self._file_path, mtime, shape_data, descriptor)
 
 
 class NodeShapeListModel(QAbstractListModel):
     # Roles
     ShapeNameRole = Qt.UserRole + 1
     ShapeRole = Qt.UserRole + 2
+    AspectRatioRole = Qt.UserRole + 3
+    AreaRole = Qt.UserRole + 4
+    PointCountRole = Qt.UserRole + 5
+    SimilarityRole = Qt.UserRole + 6
 
     def __init__(self, parent=None):
         super(NodeShapeListModel, self).__init__(parent)
 
-        self.shapes = ()
+        self.shapes = []
+        self._shape_files = []
+        self._shape_ranks = []
+
+        # Descriptors, computed once per loaded shape
+        self._descriptors = []
+        self._reference_descriptor = None
+        self._similarities = []
 
-    def updateNodeShapeList(self):
+        # Loading. Children are destroyed in creation order, the pool waits for loaders while their signals exist
+        self._thread_pool = QThreadPool(self)
+        self._generation = 0
+        self._file_paths = ()
+        self._file_ranks = {}
+        self._loaded = {}  # File path to (modification time, shape, descriptor), for the bundle
+        self._pending_count = 0
+        self._loader_signals = ShapeLoaderSignals(self)
+        self._loader_signals.loaded.connect(self._onShapeDataLoaded)
+
+        # Live updates
+        self._watcher = NodeShapeWatcher.instance()
+        self._watcher.shapeFileChanged.connect(self._onShapeFileChanged)
+        self._watcher.shapeFilesChanged.connect(self._onShapeFilesChanged)
+
+    def updateNodeShapeList(self, rescan=False):
         self.beginResetModel()
 
-        shapes = []
-        shape_files = hou.findFilesWithExtension('json', 'config/NodeShapes')
-        for file_path in shape_files:
-            shape = NodeShape.fromFile(file_path)
-            if shape.isValid():
-                shapes.append(shape)
+        if rescan:
+            NodeShapeRegistry.refresh()
+            NodeShapeWatcher.instance().watchRegistry()
+
+        self._generation += 1
+        self._thread_pool.clear()
+        self.shapes = []
+        self._shape_files = []
+        self._shape_ranks = []
+        self._descriptors = []
+        self._similarities = []
+        file_paths = NodeShapeRegistry.paths()
+        self._setFilePaths(file_paths)
+        self._loaded = {}
+
+        # Each file is checked once, missing files are left to the watcher
+        sources = []
+        for file_path in file_paths:
+            try:
+                sources.append((file_path, os.path.getmtime(file_path)))
+            except OSError:
+                pass
+
+        # Cached shapes are available right away, the rest is parsed in the background
+        cached = self._cachedShapes(sources)
+        if None in cached and loadShapeBundle(sources):
+            cached = self._cachedShapes(sources)
+
+        pending_paths = []
+        for (file_path, mtime), shape_descriptor in zip(sources, cached):
+            if shape_descriptor is None:
+                pending_paths.append(file_path)
+            else:
+                shape, descriptor = shape_descriptor
+                self._loaded[file_path] = mtime, shape, descriptor
+                if self._isListed(shape):
+                    self._insertShape(len(self.shapes), shape, file_path, descriptor)
 
-        self.shapes = tuple(shapes)
         self.endResetModel()
 
-    def rowCount(self, parent):
+        self._pending_count = 0
+        self._loadInBackground(pending_paths)
+
+    @staticmethod
+    def _cachedShapes(sources):
+        """Returns a (shape, descriptor) tuple for each source, or None if either one is not cached."""
+        cached = []
+        for file_path, mtime in sources:
+            shape = NodeShape.cachedShape(file_path, mtime, allow_excluded=True)
+            descriptor = cachedDescriptor(file_path, mtime)
+            if shape is None or (descriptor is None and shape.isValid()):
+                cached.append(None)
+            else:
+                cached.append((shape, descriptor))
+        return cached
+
+    def _setFilePaths(self, file_paths):
+        self._file_paths = file_paths
+        self._file_ranks = {file_path: rank for rank, file_path in enumerate(file_paths)}
+
+    def _loadInBackground(self, file_paths):
+        self._pending_count += len(file_paths)
+        for file_path in file_paths:
+            self._thread_pool.start(ShapeLoader(self._generation, file_path, self._loader_signals))
+
+    def stopUpdates(self):
+        """Stops background loading and live updates, the shared watcher outlives the model."""
+        # Files being read are finished, queued ones are dropped
+        self._generation += 1
+        self._thread_pool.clear()
+        self._thread_pool.waitForDone()
+        self._pending_count = 0
+
+        if self._watcher is not None:
+            self._watcher.shapeFileChanged.disconnect(self._onShapeFileChanged)
+            self._watcher.shapeFilesChanged.disconnect(self._onShapeFilesChanged)
+            self._watcher = None
+
+    def _onShapeDataLoaded(self, generation, file_path, mtime, shape_data, descriptor):
+        if generation != self._generation:
+            return
+
+        if file_path in self._file_ranks:
+            if mtime is None:  # Deleted or unreadable
+                self._loaded.pop(file_path, None)
+                self._updateShape(file_path, NodeShape(), None)
+            else:
+                shape = NodeShape.fromFileData(file_path, mtime, shape_data, allow_excluded=True)
+                if descriptor is not None:
+                    cacheDescriptor(file_path, mtime, descriptor)
+                self._loaded[file_path] = mtime, shape, descriptor
+                self._updateShape(file_path, shape, descriptor)
+
+        self._pending_count -= 1
+        if self._pending_count == 0:
+            self._saveBundle()
+
+    def _saveBundle(self):
+        """Next time the list is built from the bundle without reading the JSON files."""
+        entries = []
+        for file_path in self._file_paths:
+            if file_path not in self._loaded:  # Unreadable file
+                return
+            entries.append((file_path,) + self._loaded[file_path])
+        saveShapeBundle(entries)
+
+    @staticmethod
+    def _isListed(shape):
+        return shape.isValid() and not shape.isExcluded()
+
+    def _rowForFile(self, file_path):
+        rank = self._file_ranks.get(file_path)
+        if rank is None:
+            return
+
+        row = bisect.bisect_left(self._shape_ranks, rank)
+        if row < len(self._shape_ranks) and self._shape_ranks[row] == rank:
+            return row
+
+    def _updateShape(self, file_path, shape, descriptor):
+        row = self._rowForFile(file_path)
+
+        if row is None:
+            if not self._isListed(shape):
+                return
+
+            # Keep the Houdini path order regardless of completion order
+            row = bisect.bisect(self._shape_ranks, self._file_ranks[file_path])
+
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._insertShape(row, shape, file_path, descriptor)
+            self.endInsertRows()
+        elif self._isListed(shape):
+            self.shapes[row] = shape
+            self._descriptors[row] = descriptor
+            self._similarities[row] = self._similarity(descriptor)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, 0))
+        else:
+            self._removeRow(row)
+
+    def _insertShape(self, row, shape, file_path, descriptor):
+        self.shapes.insert(row, shape)
+        self._shape_files.insert(row, file_path)
+        self._shape_ranks.insert(row, self._file_ranks[file_path])
+        self._descriptors.insert(row, descriptor)
+        self._similarities.insert(row, self._similarity(descriptor))
+
+    def _removeRow(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for rows in (self.shapes, self._shape_files, self._shape_ranks, self._descriptors, self._similarities):
+            del rows[row]
+        self.endRemoveRows()
+
+    def _onShapeFileChanged(self, file_path):
+        if file_path not in self._file_ranks:
+            return
+
+        # The watcher has evicted the old shape, only this file is read again
+        self._loadInBackground([file_path])
+
+    def _onShapeFilesChanged(self):
+        file_paths = NodeShapeRegistry.paths()
+        old_ranks = self._file_ranks
+
+        for row in reversed(range(len(self.shapes))):
+            if self._shape_files[row] not in file_paths:
+                self._removeRow(row)
+
+        self._setFilePaths(file_paths)
+        self._shape_ranks = [self._file_ranks[file_path] for file_path in self._shape_files]
+
+        self._loadInBackground([file_path for file_path in file_paths if file_path not in old_ranks])
+
+    def _similarity(self, descriptor):
+        if self._reference_descriptor is None:
+            return 0.0
+        return descriptor.distance(self._reference_descriptor)
+
+    def setSimilarityReference(self, shape_name):
+        """Makes SimilarityRole the distance to the named shape, smaller is more similar."""
+        index = self.indexByName(shape_name) if shape_name else QModelIndex()
+        if index.isValid():
+            self._reference_descriptor = self._descriptors[index.row()]
+        else:
+            self._reference_descriptor = None
+
+        self._similarities = [self._similarity(descriptor) for descriptor in self._descriptors]
+        if self.shapes:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.shapes) - 1, 0),
+                                  [NodeShapeListModel.SimilarityRole])
+
+    def indexByName(self, name):
+        for row, shape in enumerate(self.shapes):
+            if shape.name() == name:
+                return self.index(row, 0)
+
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
         return len(self.shapes)
 
-    def index(self, row, column, parent):
+    def index(self, row, column, parent=QModelIndex()):
         if not self.hasIndex(row, column, parent):
             return QModelIndex()
 
-        return self.createIndex(row, column, self.shapes[row])
+        return self.createIndex(row, column)
 
     def data(self, index, role):
         if not index.isValid():
             return
 
-        shape = index.internalPointer()
+        row = index.row()
+        shape = self.shapes[row]
 
         if role == Qt.DisplayRole:
             return shape.name().replace('_', ' ').title()
@@ -80,3 +323,11 @@ class NodeShapeListModel(QAbstractListModel):
             return shape.name()
         elif role == NodeShapeListModel.ShapeRole:
             return shape
+        elif role == NodeShapeListModel.AspectRatioRole:
+            return self._descriptors[row].aspect_ratio
+        elif role == NodeShapeListModel.AreaRole:
+            return self._descriptors[row].area
+        elif role == NodeShapeListModel.PointCountRole:
+            return self._descriptors[row].point_count
+        elif role == NodeShapeListModel.SimilarityRole:
+            return self._similarities[row]
@@ -29,6 +29,8 @@ except ImportError:
     from PySide2.QtGui import *
     from PySide2.QtCore import *
 
+from .node_shape_delegate import NodeShapeDelegate
+
 
 class NodeShapeListView(QListView):
     # Signals
@@ -61,7 +63,12 @@ class NodeShapeListView(QListView):
         grid_size = self.gridSize()
         column_count = 7
         spacing = 5
-        grid_size.setWidth(self.viewport().width() / column_count - spacing)
+        grid_width = self.viewport().width() / column_count - spacing
+        if grid_width != grid_size.width():
+            delegate = self.itemDelegate()
+            if isinstance(delegate, NodeShapeDelegate):
+                delegate.clearCache()
+        grid_size.setWidth(grid_width)
         self.setGridSize(grid_size)
 
     def doubleClickedSignalEnabled(self):
@@ -29,55 +29,127 @@ except ImportError:
     from PySide2.QtGui import *
     from PySide2.QtCore import *
 
-from .node_shape import NodeShape
+from .node_shape import NodeShape, NodeShapeRegistry
+from .node_shape_watcher import NodeShapeWatcher
 
 
 class NodeShapePreview(QWidget):
+    # Signals
+    shapeReloaded = Signal()
+
     def __init__(self, parent=None):
         super(NodeShapePreview, self).__init__(parent)
 
+        self._shape_name = None
         self._shape = None
+        self._spacing = 1
+        self._show_parts = False
+
+        # Cache
         self._path = None
+        self._part_paths = None
+        self._pixmap = None
+        self._pixmap_size = None
+
+        # Reload when the shape file is edited or the name resolves to another file
+        watcher = NodeShapeWatcher.instance()
+        watcher.shapeFileChanged.connect(self._onShapeFileChanged)
+        watcher.shapeFilesChanged.connect(self.reloadShape)
 
     def recacheShape(self, spacing=1):
-        rect = self.rect().adjusted(spacing, spacing, -spacing, -spacing)
-        self._path = self._shape.fittedInRect(rect).painterPath()
-        self.repaint()
+        self._spacing = spacing
+        self._path = None
+        self._part_paths = None
+        self._pixmap = None
+        self.update()
+
+    def showParts(self):
+        return self._show_parts
+
+    def setShowParts(self, show):
+        """Draws inputs, outputs and flag regions in addition to the outline."""
+        if show != self._show_parts:
+            self._show_parts = show
+            self.recacheShape(self._spacing)
 
     def setShape(self, shape_name):
-        if not shape_name:
-            self._shape = None
-            self.repaint()
+        if shape_name == self._shape_name and self._shape is not None:
             return
 
-        shape = NodeShape.fromName(shape_name)
+        self._shape_name = shape_name
+        self._shape = None
 
-        if not shape.isValid():
-            self._shape = None
-            self.repaint()
-            return
+        if shape_name:
+            shape = NodeShape.fromName(shape_name)
+            if shape.isValid():
+                self._shape = shape
 
-        self._shape = shape.copy()
-        self.recacheShape()
-        self.repaint()
+        self.recacheShape(self._spacing)
+
+    def reloadShape(self):
+        if self._shape_name:
+            self._shape = None
+            self.setShape(self._shape_name)
+            self.shapeReloaded.emit()
+
+    def _onShapeFileChanged(self, file_path):
+        if self._shape_name and NodeShapeRegistry.path(self._shape_name) == file_path:
+            self.reloadShape()
+
+    def pixmap(self):
+        # The widget may be resized while hidden, without a resize event
+        if self._pixmap is None or self._pixmap_size != self.size():
+            self._pixmap = self._renderPixmap()
+            self._pixmap_size = self.size()
+        return self._pixmap
+
+    def _renderPixmap(self):
+        device_pixel_ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * device_pixel_ratio)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(self.palette().color(self.backgroundRole()))
 
-    def paintEvent(self, event):
         if not self._shape:
-            return
+            return pixmap
 
-        if not self._path:
-            self._path = self._shape.painterPath()
+        if self._path is None or self._pixmap_size != self.size():
+            spacing = self._spacing
+            rect = self.rect().adjusted(spacing, spacing, -spacing, -spacing)
+            shape = self._shape.fittedInRect(rect)
+            self._path = shape.painterPath()
 
-        p = QPainter(self)
+            # Parts are parsed only when the full node look is requested
+            if self._show_parts:
+                self._part_paths = [shape.partPainterPath(shape.flag(name)) for name in shape.flagNames()]
+                self._part_paths.append(shape.partPainterPath(shape.inputs()))
+                self._part_paths.append(shape.partPainterPath(shape.outputs()))
 
-        p.eraseRect(event.rect())
+        p = QPainter(pixmap)
 
-        rect_width = event.rect().width()
-        if rect_width < 800:
+        width = self.width()
+        if width < 800:
             p.setRenderHint(QPainter.Antialiasing)
-            if rect_width < 400:
+            if width < 400:
                 p.setRenderHint(QPainter.HighQualityAntialiasing)
 
+        p.setPen(self.palette().color(self.foregroundRole()))
         p.setBrush(p.pen().color().darker())
         p.drawPath(self._path)
+
+        if self._part_paths:
+            p.setBrush(p.pen().color())
+            for path in self._part_paths:
+                if not path.isEmpty():
+                    p.drawPath(path)
+
+        p.end()
+
+        return pixmap
+
+    def paintEvent(self, event):
+        if not self._shape:
+            return
+
+        p = QPainter(self)
+        p.drawPixmap(0, 0, self.pixmap())
         p.end()
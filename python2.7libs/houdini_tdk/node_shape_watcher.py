@@ -0,0 +1,88 @@
+"""
+Tool Development Kit for SideFX Houdini
+Copyright (C) 2021  Ivan Titov
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import print_function
+
+import os
+
+try:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+
+    Signal = pyqtSignal
+except ImportError:
+    from PySide2.QtWidgets import *
+    from PySide2.QtGui import *
+    from PySide2.QtCore import *
+
+from .node_shape import NodeShape, NodeShapeRegistry
+
+
+class NodeShapeWatcher(QObject):
+    """Evicts cached shapes when their files change on disk."""
+
+    # Signals
+    shapeFileChanged = Signal(object)
+    shapeFilesChanged = Signal()
+
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if NodeShapeWatcher._instance is None:
+            NodeShapeWatcher._instance = NodeShapeWatcher()
+        return NodeShapeWatcher._instance
+
+    def __init__(self, parent=None):
+        super(NodeShapeWatcher, self).__init__(parent)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._onFileChanged)
+        self._watcher.directoryChanged.connect(self._onDirectoryChanged)
+
+        self.watchRegistry()
+
+    def watchRegistry(self):
+        file_paths = set(NodeShapeRegistry.paths())
+        dir_paths = set(os.path.dirname(file_path) for file_path in file_paths)
+        watched_paths = set(self._watcher.files()) | set(self._watcher.directories())
+
+        removed_paths = watched_paths - file_paths - dir_paths
+        if removed_paths:
+            self._watcher.removePaths(list(removed_paths))
+
+        added_paths = (file_paths | dir_paths) - watched_paths
+        if added_paths:
+            self._watcher.addPaths(list(added_paths))
+
+    def _onFileChanged(self, file_path):
+        NodeShape.evictFile(file_path)
+
+        # Editors that save by replacing the file make the watcher drop it
+        if os.path.exists(file_path) and file_path not in self._watcher.files():
+            self._watcher.addPath(file_path)
+
+        self.shapeFileChanged.emit(file_path)
+
+    def _onDirectoryChanged(self, dir_path):
+        old_paths = NodeShapeRegistry.paths()
+        NodeShapeRegistry.refresh()
+        if NodeShapeRegistry.paths() != old_paths:
+            self.watchRegistry()
+            self.shapeFilesChanged.emit()
@@ -204,6 +204,8 @@ class UserDataWindow(QWidget):
         # Data View
         self.user_data_view = QTextEdit()
         self.shape_preview = NodeShapePreview()
+        self.shape_preview.setShowParts(True)
+        self.shape_preview.shapeReloaded.connect(self.user_data_view.viewport().update)
         self.user_data_view.viewport().installEventFilter(self)
         self.user_data_view.setPlaceholderText('Key has no data')
         self.user_data_view.installEventFilter(self)
@@ -391,10 +393,9 @@ class UserDataWindow(QWidget):
                 self.shape_preview.setFixedSize(event.size())
                 self.shape_preview.recacheShape(20)
             elif event.type() == QEvent.Paint:
-                pixmap = QPixmap(event.rect().size())
-                self.shape_preview.render(pixmap, QPoint())
                 painter = QPainter(watched)
-                painter.drawPixmap(event.rect().topLeft(), pixmap)
+                painter.drawPixmap(0, 0, self.shape_preview.pixmap())
+                painter.end()
         return False
 
     def __del__(self):